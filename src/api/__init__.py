@@ -1,8 +1,11 @@
 from fastapi import APIRouter
 
+from src.api.health import router as health_router
+from src.api.metrics import router as metrics_router
 from src.api.v1 import router as v1_router
+from src.api.well_known import router as well_known_router
 
 router = APIRouter(prefix="/api")
 router.include_router(v1_router)
 
-__all__ = ["router"]
+__all__ = ["router", "well_known_router", "health_router", "metrics_router"]
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Request
+
+from src.utils.exceptions import ServiceNotReadyHTTPError
+
+router = APIRouter(
+    prefix="/health",
+    tags=["Health"],
+)
+
+
+@router.get(
+    path="/live/",
+    summary="Процесс запущен",
+)
+async def live() -> dict[str, str]:
+    """
+    ## 💓 Проверка, что процесс отвечает на запросы
+    """
+    return {"status": "alive"}
+
+
+@router.get(
+    path="/ready/",
+    summary="Приложение готово принимать запросы",
+    responses={
+        503: {
+            "description": "Приложение ещё запускается или уже останавливается",
+            "content": {"application/json": {"example": {"detail": ServiceNotReadyHTTPError.detail}}},
+        },
+    },
+)
+async def ready(request: Request) -> dict[str, str]:
+    """
+    ## 🚦 Проверка, что соединения с БД открыты и прогреты
+    """
+    if not getattr(request.app.state, "ready", False):
+        raise ServiceNotReadyHTTPError
+    return {"status": "ready"}
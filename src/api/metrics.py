@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.utils.metrics import CONTENT_TYPE, metrics_registry
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get(
+    path="/metrics",
+    summary="Метрики в формате Prometheus",
+    response_class=PlainTextResponse,
+)
+async def metrics() -> PlainTextResponse:
+    """
+    ## 📈 Метрики всех воркеров
+    """
+    return PlainTextResponse(metrics_registry.render(), media_type=CONTENT_TYPE)
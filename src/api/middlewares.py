@@ -0,0 +1,118 @@
+import logging
+import random
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.utils import server_timing
+from src.utils.logging import get_logger
+from src.utils.metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS
+
+logger = get_logger("src.access")
+
+
+class RequestLogMiddleware:
+    # one line per request with everything known about it once the response is sent
+    def __init__(self, app: ASGIApp, sample_rate: float = 1.0) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self._log(scope, status_code, time.perf_counter() - started)
+
+    def _log(self, scope: Scope, status_code: int, seconds: float) -> None:
+        if 200 <= status_code < 300 and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        latency_ms = round(seconds * 1000, 2)
+        user_id = scope.get("state", {}).get("user_id")
+        client = scope.get("client")
+        fields = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status_code,
+            "latency_ms": latency_ms,
+            "user_id": user_id,
+            "client": client[0] if client else None,
+        }
+        logger.info(
+            '"%s %s" %d %.2fms user=%s',
+            scope["method"],
+            scope["path"],
+            status_code,
+            latency_ms,
+            user_id,
+            extra={"fields": fields},
+        )
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # the matched path template, raw paths would give every user id its own series
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUESTS.inc(method=scope["method"], route=route_path, status=status_code)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=scope["method"], route=route_path)
+
+
+class ServerTimingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings = server_timing.ServerTimings()
+        token = server_timing.start(timings)
+
+        async def send_with_timing(message: Message) -> None:
+            # everything measured before the response starts, the body is sent afterwards
+            if message["type"] == "http.response.start":
+                timings.durations["total"] = time.perf_counter() - started
+                MutableHeaders(scope=message).append("Server-Timing", timings.header_value())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            server_timing.stop(token)
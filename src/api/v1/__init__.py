@@ -1,8 +1,10 @@
 from fastapi import APIRouter
 
+from src.api.v1.admin import router as admin_router
 from src.api.v1.auth import router as auth_router
 
 router = APIRouter(prefix="/v1")
 router.include_router(auth_router)
+router.include_router(admin_router)
 
 __all__ = ["router"]
@@ -0,0 +1,41 @@
+from typing import AsyncIterator, Callable
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from src.api.v1.dependencies.auth import AdminUidByAccess
+from src.api.v1.dependencies.db import ReadDBFactoryDep
+from src.api.v1.responses.admin import ADMIN_EXPORT_USERS_RESPONSES
+from src.services.auth import AuthService
+from src.utils.db_tools import DBManager
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Administration"],
+)
+
+
+async def _users_as_ndjson(db_factory: Callable[[], DBManager]) -> AsyncIterator[bytes]:
+    # the route has already returned, so the stream needs a session of its own
+    async with db_factory() as db:
+        async for users in AuthService(db).iter_users():
+            yield "".join(user.model_dump_json() + "\n" for user in users).encode()
+
+
+@router.get(
+    path="/users/export/",
+    summary="Выгрузить всех пользователей",
+    responses=ADMIN_EXPORT_USERS_RESPONSES,
+    response_class=StreamingResponse,
+)
+async def export_users(
+    uid: AdminUidByAccess,
+    db_factory: ReadDBFactoryDep,
+) -> StreamingResponse:
+    """
+    ## 📦 Выгрузить всех пользователей в формате NDJSON
+    """
+    return StreamingResponse(
+        _users_as_ndjson(db_factory),
+        media_type="application/x-ndjson",
+    )
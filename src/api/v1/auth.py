@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Body, Response
 
-from src.api.v1.dependencies.auth import UidByAccess, UidByRefresh
-from src.api.v1.dependencies.db import DBDep
+from src.api.v1.dependencies.auth import RefreshClaims, UidByAccess, UidByRefresh
+from src.api.v1.dependencies.db import DBDep, ReadDBDep
 from src.api.v1.examples.auth import get_examples_auth_post_login, get_examples_auth_put_profile
 from src.api.v1.responses.auth import (
     AUTH_LOGIN_RESPONSES,
@@ -16,10 +16,15 @@ from src.services.auth import AuthService, TokenService
 from src.utils.exceptions import (
     InvalidLoginDataError,
     InvalidLoginDataHTTPError,
+    PasswordHashingOverloadedError,
+    PasswordHashingTimeoutError,
+    PasswordHashingUnavailableHTTPError,
     UserExistsError,
     UserExistsHTTPError,
     UserNotFoundError,
     UserNotFoundHTTPError,
+    WithdrawnTokenError,
+    WithdrawnTokenHTTPError,
 )
 
 router = APIRouter(
@@ -51,6 +56,8 @@ async def login(
         )
     except InvalidLoginDataError as exc:
         raise InvalidLoginDataHTTPError from exc
+    except (PasswordHashingOverloadedError, PasswordHashingTimeoutError) as exc:
+        raise PasswordHashingUnavailableHTTPError from exc
 
     return token_response
 
@@ -74,6 +81,8 @@ async def register(
         return await AuthService(db).register_user(register_data=register_data)
     except UserExistsError as exc:
         raise UserExistsHTTPError from exc
+    except (PasswordHashingOverloadedError, PasswordHashingTimeoutError) as exc:
+        raise PasswordHashingUnavailableHTTPError from exc
 
 
 @router.get(
@@ -82,7 +91,7 @@ async def register(
     responses=AUTH_PROFILE_RESPONSES,
 )
 async def get_profile(
-    db: DBDep,
+    db: ReadDBDep,
     uid: UidByAccess,
 ) -> UserDTO:
     """
@@ -101,16 +110,19 @@ async def get_profile(
 )
 async def refresh(
     db: DBDep,
-    uid: UidByRefresh,
+    claims: RefreshClaims,
     response: Response,
 ) -> TokenResponseDTO:
     """
     ## 🗝️ Получить новые Access и Refresh токены
     """
-    token_response: TokenResponseDTO = await TokenService(db).update_tokens(
-        uid=uid,
-        response=response,
-    )
+    try:
+        token_response: TokenResponseDTO = await TokenService(db).update_tokens(
+            claims=claims,
+            response=response,
+        )
+    except WithdrawnTokenError as exc:
+        raise WithdrawnTokenHTTPError from exc
 
     return token_response
 
@@ -131,8 +143,10 @@ async def update_profile(
     """
     ## 👤 Обновить профиль пользователя
     """
-    profile = await AuthService(db).update_profile(uid=uid, data=data)
-    return profile
+    try:
+        return await AuthService(db).update_profile(uid=uid, data=data)
+    except UserNotFoundError as exc:
+        raise UserNotFoundHTTPError from exc
 
 
 @router.post(
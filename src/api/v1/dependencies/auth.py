@@ -1,3 +1,5 @@
+import hashlib
+from datetime import datetime
 from typing import Annotated
 
 from fastapi import Depends, Request
@@ -6,9 +8,11 @@ from jwt import ExpiredSignatureError
 
 from src.api.v1.dependencies.db import DBDep
 from src.config import settings
-from src.schemas.auth import TokenType
+from src.schemas.auth import RefreshClaimsDTO, TokenType
 from src.services.auth import TokenService
+from src.utils.cache import TTLCache
 from src.utils.exceptions import (
+    AdminRequiredHTTPError,
     CannotDecodeTokenError,
     CannotDecodeTokenHTTPError,
     ExpiredSignatureHTTPError,
@@ -23,6 +27,9 @@ from src.utils.exceptions import (
 _bearer = HTTPBearer()
 BearerCredentials = Annotated[HTTPAuthorizationCredentials, Depends(_bearer)]
 
+# verified access token claims by token digest, kept until the token expires
+access_token_cache: TTLCache[bytes, dict] = TTLCache(maxsize=settings.auth.JWT_ACCESS_CACHE_SIZE, name="access_token_claims")
+
 
 def _get_access_token(creds: BearerCredentials):
     return creds.credentials
@@ -35,9 +42,16 @@ def _get_refresh_token(request: Request):
     return token
 
 
-def _decode_token(token: str):
+def _decode_token(token: str, cache: TTLCache[bytes, dict] | None = None):
+    digest = None
+    if cache is not None:
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        payload = cache.get(digest)
+        if payload is not None:
+            return payload
+
     try:
-        return TokenService().decode_token(token)
+        payload = TokenService().decode_token(token)
     except TokenExipedError as exc:
         raise ExpiredSignatureHTTPError from exc
     except ExpiredSignatureError as exc:
@@ -45,6 +59,11 @@ def _decode_token(token: str):
     except CannotDecodeTokenError as exc:
         raise CannotDecodeTokenHTTPError from exc
 
+    expires_at = payload.get("exp")
+    if cache is not None and digest is not None and isinstance(expires_at, (int, float)):
+        cache.set(digest, payload, expires_at=expires_at)
+    return payload
+
 
 def _validate_token_type(payload: dict, expected_type: TokenType):
     token_type = payload.get("type")
@@ -62,30 +81,56 @@ def _extract_token_subject(payload: dict) -> str:
     return sub
 
 
+def get_refresh_claims(request: Request) -> RefreshClaimsDTO:
+    token = _get_refresh_token(request)
+    payload = _decode_token(token)
+    _validate_token_type(payload, TokenType.REFRESH)
+    uid = int(_extract_token_subject(payload))
+    request.state.user_id = uid
+    return RefreshClaimsDTO(
+        user_id=uid,
+        hashed_data=TokenService().hash_token(token),
+        # exp in whole seconds, the stored token expires within the following second
+        expires_at=datetime.fromtimestamp(int(payload.get("exp", 0))),
+    )
+
+
 def resolve_token_by_type(token_type: TokenType):
     if token_type == TokenType.ACCESS:
 
-        def get_sub_from_access(creds: BearerCredentials):
-            payload = _decode_token(_get_access_token(creds))
+        def get_sub_from_access(request: Request, creds: BearerCredentials):
+            payload = _decode_token(_get_access_token(creds), cache=access_token_cache)
             _validate_token_type(payload, token_type)
-            return int(_extract_token_subject(payload))
+            uid = int(_extract_token_subject(payload))
+            # picked up by RequestLogMiddleware
+            request.state.user_id = uid
+            return uid
 
         return get_sub_from_access
 
     elif token_type == TokenType.REFRESH:
 
         async def get_sub_from_refresh(request: Request, db: DBDep):
-            payload = _decode_token(_get_refresh_token(request))
-            _validate_token_type(payload, token_type)
-            uid = int(_extract_token_subject(payload))
+            claims = get_refresh_claims(request)
             try:
-                await db.tokens.get_one(user_id=uid, type=token_type)
+                await db.tokens.get_valid(claims.user_id, token_type, expires_after=claims.expires_at)
             except ObjectNotFoundError as exc:
                 raise WithdrawnTokenHTTPError from exc
-            return uid
+            return claims.user_id
 
         return get_sub_from_refresh
 
 
 UidByAccess = Annotated[int, Depends(resolve_token_by_type(TokenType.ACCESS))]
 UidByRefresh = Annotated[int, Depends(resolve_token_by_type(TokenType.REFRESH))]
+# the stored token is checked later by the statement that rotates it
+RefreshClaims = Annotated[RefreshClaimsDTO, Depends(get_refresh_claims)]
+
+
+def get_admin_uid(uid: UidByAccess) -> int:
+    if uid not in settings.auth.ADMIN_USER_IDS:
+        raise AdminRequiredHTTPError
+    return uid
+
+
+AdminUidByAccess = Annotated[int, Depends(get_admin_uid)]
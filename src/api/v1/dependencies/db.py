@@ -1,13 +1,14 @@
-from typing import Annotated, Any, AsyncGenerator
+from functools import partial
+from typing import Annotated, Any, AsyncGenerator, Callable
 
 from fastapi import Depends
 
-from src.db import sessionmaker, sessionmaker_null_pool
+from src.db import replica_router, sessionmaker, sessionmaker_null_pool, sessionmaker_read, sessionmaker_read_null_pool
 from src.utils.db_tools import DBManager
 
 
 async def get_db() -> AsyncGenerator[DBManager, Any]:
-    async with DBManager(session_factory=sessionmaker) as db:
+    async with DBManager(session_factory=sessionmaker, replica_router=replica_router) as db:
         yield db
 
 
@@ -16,4 +17,28 @@ async def get_db_with_null_pool() -> AsyncGenerator[DBManager, Any]:
         yield db
 
 
+async def get_read_db() -> AsyncGenerator[DBManager, Any]:
+    async with DBManager(session_factory=sessionmaker_read, replica_router=replica_router) as db:
+        yield db
+
+
+async def get_read_db_with_null_pool() -> AsyncGenerator[DBManager, Any]:
+    async with DBManager(session_factory=sessionmaker_read_null_pool) as db:
+        yield db
+
+
 DBDep = Annotated[DBManager, Depends(get_db)]
+# read-only autocommit sessions for handlers that never write
+ReadDBDep = Annotated[DBManager, Depends(get_read_db)]
+
+
+def get_read_db_factory() -> Callable[[], DBManager]:
+    return partial(DBManager, session_factory=sessionmaker_read, replica_router=replica_router)
+
+
+def get_read_db_factory_with_null_pool() -> Callable[[], DBManager]:
+    return partial(DBManager, session_factory=sessionmaker_read_null_pool)
+
+
+# for responses that keep reading from the database after the route returns
+ReadDBFactoryDep = Annotated[Callable[[], DBManager], Depends(get_read_db_factory)]
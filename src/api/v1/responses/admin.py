@@ -0,0 +1,45 @@
+from typing import Any
+
+from fastapi import status
+
+from src.utils.exceptions import (
+    AdminRequiredHTTPError,
+    ExpiredSignatureHTTPError,
+    MissingTokenHTTPError,
+)
+
+ADMIN_EXPORT_USERS_RESPONSES: dict[int | str, dict[str, Any]] | None = {
+    status.HTTP_200_OK: {
+        "description": "Пользователи, по одному JSON объекту на строку",
+        "content": {
+            "application/x-ndjson": {
+                "example": '{"id":1,"username":"cool_user","first_name":"Veronika","last_name":"Ivanova"}\n',
+            },
+        },
+    },
+    status.HTTP_403_FORBIDDEN: {
+        "description": "Недостаточно прав",
+        "content": {"application/json": {"example": {"detail": AdminRequiredHTTPError.detail}}},
+    },
+    status.HTTP_401_UNAUTHORIZED: {
+        "description": "Не аутентифицирован",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "MissingToken": {
+                        "summary": "MissingToken",
+                        "value": {
+                            "detail": MissingTokenHTTPError.detail,
+                        },
+                    },
+                    "ExpiredSignature": {
+                        "description": "Просроченная подпись токена",
+                        "value": {
+                            "detail": ExpiredSignatureHTTPError.detail,
+                        },
+                    },
+                },
+            },
+        },
+    },
+}
@@ -9,6 +9,7 @@ from src.utils.exceptions import (
     InvalidTokenTypeHTTPError,
     MissingSubjectHTTPError,
     MissingTokenHTTPError,
+    PasswordHashingUnavailableHTTPError,
     UserExistsHTTPError,
     UserNotFoundHTTPError,
     WithdrawnTokenHTTPError,
@@ -85,6 +86,10 @@ AUTH_LOGIN_RESPONSES: Dict[int | str, Dict[str, Any]] | None = {
         "description": "Неверные данные для входа",
         "content": {"application/json": {"example": {"detail": InvalidLoginDataHTTPError.detail}}},
     },
+    status.HTTP_503_SERVICE_UNAVAILABLE: {
+        "description": "Сервис перегружен",
+        "content": {"application/json": {"example": {"detail": PasswordHashingUnavailableHTTPError.detail}}},
+    },
 }
 
 AUTH_LOGOUT_RESPONSES: Dict[int | str, Dict[str, Any]] | None = {
@@ -132,6 +137,10 @@ AUTH_REGISTER_RESPONSES: Dict[int | str, Dict[str, Any]] | None = {
         "description": "Пользователь с таким username уже зарегистрирован",
         "content": {"application/json": {"example": {"detail": UserExistsHTTPError.detail}}},
     },
+    status.HTTP_503_SERVICE_UNAVAILABLE: {
+        "description": "Сервис перегружен",
+        "content": {"application/json": {"example": {"detail": PasswordHashingUnavailableHTTPError.detail}}},
+    },
 }
 
 
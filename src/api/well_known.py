@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Request, Response, status
+
+from src.config import settings
+from src.utils.signers import key_store
+
+router = APIRouter(
+    prefix="/.well-known",
+    tags=["Well-Known"],
+)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+@router.get(
+    path="/jwks.json",
+    summary="Публичные ключи для проверки JWT токенов",
+)
+async def get_jwks(request: Request) -> Response:
+    """
+    ## 🔑 JSON Web Key Set для проверки подписи access токенов
+    """
+    content, etag = key_store.get_jwks()
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.auth.JWKS_MAX_AGE}",
+    }
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=content, media_type="application/json", headers=headers)
@@ -2,11 +2,13 @@ from datetime import timedelta
 from pathlib import Path
 from typing import Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 BASE_DIR = Path(__file__).parent.parent
 
+JWTAlgorithm = Literal["RS256", "ES256", "EdDSA", "HS256"]
+
 
 class DBConfig(BaseModel):
     ### sqlalchemy
@@ -22,6 +24,31 @@ class DBConfig(BaseModel):
         "pk": "pk_%(table_name)s",
     }
 
+    ### connection pool
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = False
+    # connections opened before the worker reports readiness, None means DB_POOL_SIZE;
+    # at most DB_POOL_SIZE + DB_MAX_OVERFLOW are opened
+    DB_WARMUP_CONNECTIONS: int | None = None
+
+    ### asyncpg
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    DB_COMMAND_TIMEOUT: float | None = None
+    DB_CONNECT_TIMEOUT: float = 60.0
+    DB_STATEMENT_TIMEOUT: int | None = None
+    DB_IDLE_IN_TRANSACTION_SESSION_TIMEOUT: int | None = None
+    DB_APPLICATION_NAME: str | None = None
+    # PgBouncer in transaction mode cannot keep prepared statements between transactions
+    DB_PGBOUNCER: bool = False
+
+    ### read replicas
+    DB_REPLICA_URLS: list[str] = []
+    DB_REPLICA_SELECTION: Literal["round_robin", "least_busy"] = "round_robin"
+
     ### database config
     DB_HOST: str
     DB_USER: str
@@ -40,9 +67,38 @@ class TokenConfig(BaseModel):
     REFRESH_TOKEN_COOKIE_KEY: str = "refresh_token"
     JWT_EXPIRE_DELTA_ACCESS: timedelta = timedelta(minutes=15)
     JWT_EXPIRE_DELTA_REFRESH: timedelta = timedelta(days=30)
-    JWT_ALGORITHM: str = "RS256"
+    JWT_ALGORITHM: JWTAlgorithm = "RS256"
+    JWT_ACCESS_ALGORITHM: JWTAlgorithm | None = None
+    JWT_REFRESH_ALGORITHM: JWTAlgorithm | None = None
     JWT_PRIVATE_KEY: Path = BASE_DIR / "creds" / "jwt-private.pem"
     JWT_PUBLIC_KEY: Path = BASE_DIR / "creds" / "jwt-public.pem"
+    JWT_ES256_PRIVATE_KEY: Path = BASE_DIR / "creds" / "jwt-es256-private.pem"
+    JWT_ES256_PUBLIC_KEY: Path = BASE_DIR / "creds" / "jwt-es256-public.pem"
+    JWT_EDDSA_PRIVATE_KEY: Path = BASE_DIR / "creds" / "jwt-ed25519-private.pem"
+    JWT_EDDSA_PUBLIC_KEY: Path = BASE_DIR / "creds" / "jwt-ed25519-public.pem"
+    JWT_HS256_SECRET: SecretStr | None = None
+    JWT_ADDITIONAL_PUBLIC_KEYS: list[Path] = []
+    JWT_KEYS_CHECK_INTERVAL: float = 5.0
+    JWKS_MAX_AGE: int = 3600
+    JWT_ACCESS_CACHE_SIZE: int = 10000
+    ADMIN_USER_IDS: list[int] = []
+
+    ### password hashing
+    PWD_HASHING_EXECUTOR: Literal["thread", "process"] = "thread"
+    PWD_HASHING_WORKERS: int | None = None
+    PWD_HASHING_MAX_PENDING: int = 64
+    PWD_HASHING_TIMEOUT: float | None = 10.0
+
+    ### expired tokens purge
+    TOKENS_PURGE_ENABLED: bool = True
+    TOKENS_PURGE_INTERVAL: float = 600.0
+    TOKENS_PURGE_BATCH_SIZE: int = 1000
+    # keeps the purge from saturating WAL and replication, 0 means no limit
+    TOKENS_PURGE_MAX_BATCHES_PER_SECOND: float = 10.0
+    # tokens is range partitioned on expires_at, whole partitions are dropped once expired
+    TOKENS_PARTITION_INTERVAL: timedelta = timedelta(days=7)
+    # must stay above JWT_EXPIRE_DELTA_REFRESH, otherwise new tokens land in the default partition
+    TOKENS_PARTITIONS_AHEAD: timedelta = timedelta(days=45)
 
 
 class GunicornConfig(BaseModel):
@@ -62,6 +118,26 @@ class UvicornConfig(BaseModel):
     UVICORN_RELOAD: bool = True
 
 
+class LoggingConfig(BaseModel):
+    # records waiting for the writer thread, further ones are dropped and counted
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_FORMAT: Literal["text", "json"] = "text"
+    # funcName, module and lineno walk the stack for every record, None keeps them for the text format only
+    LOG_CALLER_INFO: bool | None = None
+    # share of 2xx request lines that are written, other statuses are always logged
+    LOG_ACCESS_SAMPLE_RATE: float = 1.0
+
+
+class MetricsConfig(BaseModel):
+    METRICS_ENABLED: bool = True
+    # every process writes its values there for /metrics to sum up, None lets gunicorn create a temporary one
+    METRICS_DIR: Path | None = None
+    # how stale the values of other workers may be on a scrape
+    METRICS_FLUSH_INTERVAL: float = 5.0
+    # Server-Timing header with db, bcrypt, sign, decode and total durations, visible to every client
+    SERVER_TIMING_ENABLED: bool = False
+
+
 class GeneralAppConfig(BaseModel):
     TITLE: str = "FastAPI JWT Authentication"
     MODE: Literal["TEST", "DEV"]
@@ -75,6 +151,8 @@ class Settings(BaseSettings):
     auth: TokenConfig = TokenConfig()
     uvicorn: UvicornConfig = UvicornConfig()
     gunicorn: GunicornConfig = GunicornConfig()
+    logging: LoggingConfig = LoggingConfig()
+    metrics: MetricsConfig = MetricsConfig()
 
     model_config = SettingsConfigDict(
         env_file=BASE_DIR / ".env",
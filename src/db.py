@@ -1,11 +1,79 @@
-from sqlalchemy import NullPool
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from itertools import count
+from typing import Sequence
+from uuid import uuid4
+
+from sqlalchemy import Connection, NullPool, event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.util import await_only
+
+from src.config import DBConfig, settings
+
+
+def _unique_statement_name() -> str:
+    return f"__asyncpg_{uuid4()}__"
+
+
+def get_connect_args(config: DBConfig, read_only: bool = False) -> dict:
+    server_settings = {}
+    if read_only and not config.DB_PGBOUNCER:
+        server_settings["default_transaction_read_only"] = "on"
+    if config.DB_STATEMENT_TIMEOUT is not None:
+        server_settings["statement_timeout"] = str(config.DB_STATEMENT_TIMEOUT)
+    if config.DB_IDLE_IN_TRANSACTION_SESSION_TIMEOUT is not None:
+        server_settings["idle_in_transaction_session_timeout"] = str(config.DB_IDLE_IN_TRANSACTION_SESSION_TIMEOUT)
+    if config.DB_APPLICATION_NAME is not None:
+        server_settings["application_name"] = config.DB_APPLICATION_NAME
+
+    connect_args = {
+        "statement_cache_size": config.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": config.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        "command_timeout": config.DB_COMMAND_TIMEOUT,
+        "timeout": config.DB_CONNECT_TIMEOUT,
+        "server_settings": server_settings,
+    }
+    if config.DB_PGBOUNCER:
+        # a transaction may run on any server connection, so statements are never reused
+        # and every one gets a name that cannot collide with another client's
+        connect_args.update(
+            statement_cache_size=0,
+            prepared_statement_cache_size=0,
+            prepared_statement_name_func=_unique_statement_name,
+        )
+    return connect_args
+
+
+def get_pool_options(config: DBConfig) -> dict:
+    return {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+    }
+
+
+class EngineRouter:
+    def __init__(self, engines: Sequence[AsyncEngine], selection: str = "round_robin") -> None:
+        self.engines = list(engines)
+        self.selection = selection
+        self._counter = count()
+
+    def choose(self) -> AsyncEngine:
+        if self.selection == "least_busy":
+            return min(self.engines, key=self._checked_out)
+        return self.engines[next(self._counter) % len(self.engines)]
+
+    @staticmethod
+    def _checked_out(engine: AsyncEngine) -> int:
+        checkedout = getattr(engine.pool, "checkedout", None)
+        return checkedout() if checkedout is not None else 0
 
-from src.config import settings
 
 engine = create_async_engine(
     url=settings.db.DB_URL,
     echo=settings.db.DB_ECHO,
+    connect_args=get_connect_args(settings.db),
+    **get_pool_options(settings.db),
 )
 
 sessionmaker = async_sessionmaker(
@@ -19,6 +87,7 @@ sessionmaker = async_sessionmaker(
 engine_null_pool = create_async_engine(
     url=settings.db.DB_URL,
     poolclass=NullPool,
+    connect_args=get_connect_args(settings.db),
 )
 
 sessionmaker_null_pool = async_sessionmaker(
@@ -27,3 +96,52 @@ sessionmaker_null_pool = async_sessionmaker(
     autoflush=settings.db.DB_AUTOFLUSH,
     expire_on_commit=settings.db.DB_EXPIRE_ON_COMMIT,
 )
+
+
+def _switch_read_only(connection: Connection) -> None:
+    # read and write sessions share the pool, a connection is switched only when its next user needs the other mode
+    read_only = connection.get_execution_options().get("read_only", False)
+    info = connection.connection.info
+    if info.get("read_only", False) == read_only:
+        return
+    driver_connection = connection.connection.driver_connection
+    value = "on" if read_only else "off"
+    await_only(driver_connection.execute(f"SET default_transaction_read_only = {value}"))  # pyright: ignore
+    info["read_only"] = read_only
+
+
+# a SET would stay on a PgBouncer server connection and reach other clients
+if not settings.db.DB_PGBOUNCER:
+    event.listen(engine.sync_engine, "engine_connect", _switch_read_only)
+    event.listen(engine_null_pool.sync_engine, "engine_connect", _switch_read_only)
+
+# autocommit: a single SELECT needs neither BEGIN nor ROLLBACK; the connections come from the primary pool
+engine_read = engine.execution_options(isolation_level="AUTOCOMMIT", read_only=True)
+
+sessionmaker_read = async_sessionmaker(
+    bind=engine_read,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=settings.db.DB_EXPIRE_ON_COMMIT,
+)
+
+engine_read_null_pool = engine_null_pool.execution_options(isolation_level="AUTOCOMMIT", read_only=True)
+
+sessionmaker_read_null_pool = async_sessionmaker(
+    bind=engine_read_null_pool,
+    autoflush=False,
+    expire_on_commit=settings.db.DB_EXPIRE_ON_COMMIT,
+)
+
+replica_engines = [
+    create_async_engine(
+        url=url,
+        echo=settings.db.DB_ECHO,
+        isolation_level="AUTOCOMMIT",
+        connect_args=get_connect_args(settings.db, read_only=True),
+        **get_pool_options(settings.db),
+    )
+    for url in settings.db.DB_REPLICA_URLS
+]
+
+replica_router = EngineRouter(replica_engines, settings.db.DB_REPLICA_SELECTION) if replica_engines else None
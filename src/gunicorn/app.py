@@ -1,8 +1,14 @@
+import shutil
+import tempfile
+from pathlib import Path
+
 from fastapi import FastAPI
 from gunicorn.app.base import BaseApplication
 from gunicorn.config import Config
 
-from src.utils.logging import get_logging_config
+from src.config import settings
+from src.utils.logging import get_logging_config, log_queue
+from src.utils.metrics import metrics_registry
 
 
 class GunicornApp(BaseApplication):
@@ -32,6 +38,28 @@ class GunicornApp(BaseApplication):
             self.cfg.set(k.lower(), v)
 
 
+def post_fork(server, worker) -> None:
+    # the master configured logging without the queue, every worker starts its own writer thread
+    log_queue.install(get_logging_config())
+
+
+def on_starting(server) -> None:
+    # set before the workers are forked, so all of them write to the same directory
+    if settings.metrics.METRICS_DIR is not None:
+        metrics_registry.use_directory(settings.metrics.METRICS_DIR)
+    else:
+        metrics_registry.use_directory(Path(tempfile.mkdtemp(prefix="metrics-")))
+
+
+def child_exit(server, worker) -> None:
+    metrics_registry.mark_process_dead(worker.pid)
+
+
+def on_exit(server) -> None:
+    if settings.metrics.METRICS_DIR is None and metrics_registry.directory is not None:
+        shutil.rmtree(metrics_registry.directory, ignore_errors=True)
+
+
 def get_app_options(
     host: str,
     port: int,
@@ -51,4 +79,8 @@ def get_app_options(
         "timeout": timeout,
         "reload": reload,
         "logconfig_dict": get_logging_config(),
+        "post_fork": post_fork,
+        "on_starting": on_starting,
+        "child_exit": child_exit,
+        "on_exit": on_exit,
     }
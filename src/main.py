@@ -1,5 +1,7 @@
+import asyncio
 import sys
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
+from functools import partial
 from pathlib import Path
 from typing import AsyncGenerator
 
@@ -8,22 +10,69 @@ sys.path.append(str(Path(__file__).parent.parent))
 import uvicorn
 from fastapi import FastAPI
 
+from src.api import health_router, metrics_router, well_known_router
 from src.api import router as main_router
+from src.api.middlewares import MetricsMiddleware, RequestLogMiddleware, ServerTimingMiddleware
 from src.config import settings
-from src.db import engine
-from src.utils.db_tools import DBHealthChecker
-from src.utils.logging import configurate_logging, get_logger
+from src.db import engine, engine_null_pool, replica_engines
+from src.utils.db_tools import DBHealthChecker, DBWarmer, ExpiredTokensPurger
+from src.utils.hashing import password_hasher
+from src.utils.logging import configurate_logging, get_logger, log_queue
+from src.utils.metrics import metrics_registry, observe_pools
+from src.utils.signers import key_store
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     logger = get_logger("src")
 
+    app.state.ready = False
+    key_store.check()
     await DBHealthChecker(engine=engine).check()
 
     logger.info("All checks passed!")
+    warmup_connections = settings.db.DB_WARMUP_CONNECTIONS
+    if warmup_connections is None:
+        warmup_connections = settings.db.DB_POOL_SIZE
+    if warmup_connections > 0:
+        await DBWarmer(engine=engine).warm_up(connections=warmup_connections)
+        for replica_engine in replica_engines:
+            await DBWarmer(engine=replica_engine).warm_up(connections=warmup_connections)
+
+    # every worker schedules the purge, the advisory lock lets only one of them run it at a time;
+    # it gets its own connections instead of taking them from the request pool
+    app.state.token_purger = ExpiredTokensPurger(
+        engine=engine_null_pool,
+        batch_size=settings.auth.TOKENS_PURGE_BATCH_SIZE,
+        max_batches_per_second=settings.auth.TOKENS_PURGE_MAX_BATCHES_PER_SECOND,
+        partition_interval=settings.auth.TOKENS_PARTITION_INTERVAL,
+        partitions_ahead=settings.auth.TOKENS_PARTITIONS_AHEAD,
+    )
+    purge_task = None
+    if settings.auth.TOKENS_PURGE_ENABLED:
+        purge_task = asyncio.create_task(app.state.token_purger.run(interval=settings.auth.TOKENS_PURGE_INTERVAL))
+
+    metrics_task = None
+    if metrics_registry.directory is not None:
+        metrics_task = asyncio.create_task(metrics_registry.run_flush(interval=settings.metrics.METRICS_FLUSH_INTERVAL))
+
+    app.state.ready = True
     yield
+    app.state.ready = False
     logger.info("Shutting down...")
+    for task in (purge_task, metrics_task):
+        if task is None:
+            continue
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    metrics_registry.flush()
+    password_hasher.shutdown()
+    await engine.dispose()
+    for replica_engine in replica_engines:
+        await replica_engine.dispose()
+    # a gunicorn worker may be ended by a re-raised signal without running atexit
+    log_queue.uninstall()
 
 
 configurate_logging()
@@ -31,7 +80,18 @@ app = FastAPI(
     lifespan=lifespan,
     title=settings.app.TITLE,
 )
+app.add_middleware(RequestLogMiddleware, sample_rate=settings.logging.LOG_ACCESS_SAMPLE_RATE)
 app.include_router(main_router)
+app.include_router(well_known_router)
+app.include_router(health_router)
+if settings.metrics.SERVER_TIMING_ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
+if settings.metrics.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+    pool_engines = {"primary": engine}
+    pool_engines.update((f"replica_{i}", replica_engine) for i, replica_engine in enumerate(replica_engines))
+    metrics_registry.add_collector(partial(observe_pools, pool_engines))
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -0,0 +1,41 @@
+"""unique token per user and type
+
+Revision ID: 3f1c2b7a9d10
+Revises: 8093419d4e91
+Create Date: 2026-10-18 15:00:12.318204
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1c2b7a9d10"
+down_revision: str | Sequence[str] | None = "8093419d4e91"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # keep only the latest token of each type per user
+    op.execute(
+        """
+        DELETE FROM tokens AS t
+        USING tokens AS newer
+        WHERE t.user_id = newer.user_id
+          AND t.type = newer.type
+          AND t.id < newer.id
+        """
+    )
+    op.create_unique_constraint(
+        op.f("uq_tokens_user_id"),
+        "tokens",
+        ["user_id", "type"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint(op.f("uq_tokens_user_id"), "tokens", type_="unique")
@@ -0,0 +1,69 @@
+"""tokens covering and hash indexes
+
+Revision ID: 9b4e6d2c1a57
+Revises: 3f1c2b7a9d10
+Create Date: 2026-10-18 16:20:41.905113
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9b4e6d2c1a57"
+down_revision: str | Sequence[str] | None = "3f1c2b7a9d10"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # indexes are built without blocking writes, CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "uq_tokens_user_id_covering",
+            "tokens",
+            ["user_id", "type"],
+            unique=True,
+            postgresql_include=["id", "hashed_data", "expires_at"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            op.f("ix_tokens_hashed_data"),
+            "tokens",
+            ["hashed_data"],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+    # swapping the index behind the constraint only touches the catalog
+    op.execute(
+        """
+        ALTER TABLE tokens
+            DROP CONSTRAINT uq_tokens_user_id,
+            ADD CONSTRAINT uq_tokens_user_id UNIQUE USING INDEX uq_tokens_user_id_covering
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f("ix_tokens_hashed_data"), table_name="tokens", postgresql_concurrently=True, if_exists=True)
+        op.create_index(
+            "uq_tokens_user_id_plain",
+            "tokens",
+            ["user_id", "type"],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+    op.execute(
+        """
+        ALTER TABLE tokens
+            DROP CONSTRAINT uq_tokens_user_id,
+            ADD CONSTRAINT uq_tokens_user_id UNIQUE USING INDEX uq_tokens_user_id_plain
+        """
+    )
@@ -0,0 +1,110 @@
+"""partition tokens by expires_at
+
+Revision ID: c7d3a1f5e2b8
+Revises: 9b4e6d2c1a57
+Create Date: 2026-10-18 17:40:12.318204
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c7d3a1f5e2b8"
+down_revision: str | Sequence[str] | None = "9b4e6d2c1a57"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # the table is rebuilt, expired tokens are left behind
+    op.execute("ALTER TABLE tokens RENAME TO tokens_unpartitioned")
+    op.execute(
+        """
+        ALTER TABLE tokens_unpartitioned
+            DROP CONSTRAINT pk_tokens,
+            DROP CONSTRAINT uq_tokens_user_id,
+            DROP CONSTRAINT fk_tokens_user_id_users
+        """
+    )
+    op.drop_index("ix_tokens_hashed_data", table_name="tokens_unpartitioned")
+
+    op.execute("CREATE TABLE tokens (LIKE tokens_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (expires_at)")
+    op.execute("ALTER SEQUENCE tokens_id_seq OWNED BY tokens.id")
+    op.execute(
+        """
+        ALTER TABLE tokens
+            ADD CONSTRAINT pk_tokens PRIMARY KEY (id, expires_at),
+            ADD CONSTRAINT fk_tokens_user_id_users FOREIGN KEY (user_id) REFERENCES users (id)
+        """
+    )
+    op.create_index(
+        "ix_tokens_user_id_type", "tokens", ["user_id", "type"], postgresql_include=["id", "hashed_data", "expires_at"]
+    )
+    op.create_index(op.f("ix_tokens_hashed_data"), "tokens", ["hashed_data"])
+    op.execute("CREATE TABLE tokens_default PARTITION OF tokens DEFAULT")
+    # weekly partitions up to the latest stored token, ExpiredTokensPurger continues from the last one
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            lower timestamp := date_trunc('day', localtimestamp);
+            last timestamp := greatest(
+                (SELECT max(expires_at) FROM tokens_unpartitioned),
+                localtimestamp + interval '45 days'
+            );
+        BEGIN
+            WHILE lower <= last LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF tokens FOR VALUES FROM (%L) TO (%L)',
+                    'tokens_p' || to_char(lower, 'YYYYMMDD'),
+                    lower,
+                    lower + interval '7 days'
+                );
+                lower := lower + interval '7 days';
+            END LOOP;
+        END
+        $$
+        """
+    )
+    op.execute("INSERT INTO tokens SELECT * FROM tokens_unpartitioned WHERE expires_at > localtimestamp")
+    op.drop_table("tokens_unpartitioned")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE tokens RENAME TO tokens_partitioned")
+    op.execute("ALTER TABLE tokens_partitioned DROP CONSTRAINT fk_tokens_user_id_users")
+    op.drop_index("ix_tokens_user_id_type", table_name="tokens_partitioned")
+    op.drop_index("ix_tokens_hashed_data", table_name="tokens_partitioned")
+    op.execute("ALTER TABLE tokens_partitioned DROP CONSTRAINT pk_tokens")
+
+    op.execute("CREATE TABLE tokens (LIKE tokens_partitioned INCLUDING DEFAULTS)")
+    op.execute("ALTER SEQUENCE tokens_id_seq OWNED BY tokens.id")
+    # the latest token of every user and type survives, as the unique constraint requires
+    op.execute(
+        """
+        INSERT INTO tokens
+        SELECT DISTINCT ON (user_id, type) * FROM tokens_partitioned
+        ORDER BY user_id, type, updated_at DESC, id DESC
+        """
+    )
+    op.execute(
+        """
+        ALTER TABLE tokens
+            ADD CONSTRAINT pk_tokens PRIMARY KEY (id),
+            ADD CONSTRAINT fk_tokens_user_id_users FOREIGN KEY (user_id) REFERENCES users (id)
+        """
+    )
+    op.create_index(
+        "uq_tokens_user_id",
+        "tokens",
+        ["user_id", "type"],
+        unique=True,
+        postgresql_include=["id", "hashed_data", "expires_at"],
+    )
+    op.execute("ALTER TABLE tokens ADD CONSTRAINT uq_tokens_user_id UNIQUE USING INDEX uq_tokens_user_id")
+    op.create_index(op.f("ix_tokens_hashed_data"), "tokens", ["hashed_data"], unique=True)
+    op.drop_table("tokens_partitioned")
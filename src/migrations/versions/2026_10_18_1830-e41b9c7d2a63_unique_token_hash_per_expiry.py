@@ -0,0 +1,31 @@
+"""unique token hash per expiry
+
+Revision ID: e41b9c7d2a63
+Revises: c7d3a1f5e2b8
+Create Date: 2026-10-18 18:30:27.604391
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e41b9c7d2a63"
+down_revision: str | Sequence[str] | None = "c7d3a1f5e2b8"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # a unique index of the partitioned table needs the partition key, a token embeds its
+    # expiry so the hash stays unique. CONCURRENTLY is not supported on partitioned tables
+    op.drop_index("ix_tokens_hashed_data", table_name="tokens")
+    op.create_index("ix_tokens_hashed_data", "tokens", ["hashed_data", "expires_at"], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_tokens_hashed_data", table_name="tokens")
+    op.create_index(op.f("ix_tokens_hashed_data"), "tokens", ["hashed_data"])
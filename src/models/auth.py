@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import CheckConstraint, ForeignKey, Integer, String
+from sqlalchemy import DDL, CheckConstraint, ForeignKey, Index, Integer, String, event
 from sqlalchemy.dialects.postgresql import ENUM
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -27,4 +27,21 @@ class Token(Base):
     user_id: Mapped[int] = mapped_column(ForeignKey(f"{User.__tablename__}.id"))
     type: Mapped[TokenType] = mapped_column(ENUM(TokenType))
     hashed_data: Mapped[str]
-    expires_at: Mapped[datetime]
+    # partition key, expired partitions are dropped instead of deleting their rows
+    expires_at: Mapped[datetime] = mapped_column(primary_key=True)
+
+    # unique indexes of a partitioned table must contain the partition key,
+    # one token per user and type is kept by TokenRepo.upsert instead.
+    # A token embeds its expiry, so equal hashes always come with equal expires_at
+    # and the hash stays unique across the whole table
+    __table_args__ = (
+        Index("ix_tokens_user_id_type", "user_id", "type", postgresql_include=["id", "hashed_data", "expires_at"]),
+        Index("ix_tokens_hashed_data", "hashed_data", "expires_at", unique=True),
+        {"postgresql_partition_by": "RANGE (expires_at)"},
+    )
+
+
+# rows outside of the range partitions created by ExpiredTokensPurger land here
+event.listen(
+    Token.__table__, "after_create", DDL(f"CREATE TABLE {Token.__tablename__}_default PARTITION OF {Token.__tablename__} DEFAULT")
+)
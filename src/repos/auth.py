@@ -1,10 +1,11 @@
-from sqlalchemy import select
-from sqlalchemy.exc import NoResultFound
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, exists, func, insert, literal, select, update
 
 from src.models.auth import Token, User
-from src.repos.base import BaseRepo
+from src.repos.base import BaseRepo, timed_query
 from src.repos.mappers.mappers import AuthMapper, TokenMapper
-from src.schemas.auth import TokenDTO, UserDTO, UserWithPasswordDTO
+from src.schemas.auth import RefreshClaimsDTO, TokenAddDTO, TokenDTO, TokenType, UserDTO, UserWithPasswordDTO
 from src.utils.exceptions import ObjectNotFoundError
 
 
@@ -13,17 +14,96 @@ class AuthRepo(BaseRepo[User, UserDTO]):
     schema = UserDTO
     mapper = AuthMapper
 
+    @timed_query
     async def get_user_with_passwd(self, **filter_by) -> UserWithPasswordDTO:
-        query = select(self.model).filter_by(**filter_by)
-        result = await self.session.execute(query)
-        try:
-            obj = result.scalar_one()
-        except NoResultFound:
-            raise ObjectNotFoundError
-        return UserWithPasswordDTO.model_validate(obj)
+        # a lagging replica would reject a login right after registering
+        return await self.get_one_as(UserWithPasswordDTO, primary=True, **filter_by)
 
 
 class TokenRepo(BaseRepo[Token, TokenDTO]):
     model = Token
     schema = TokenDTO
     mapper = TokenMapper
+
+    @timed_query
+    async def get_valid(self, user_id: int, type: TokenType, expires_after: datetime) -> TokenDTO:
+        # the stored token never expires before the one presented, which prunes older partitions;
+        # a lagging replica could still accept a token that was already rotated
+        return await self.get_one(self.model.expires_at >= expires_after, primary=True, user_id=user_id, type=type)
+
+    async def _lock_owner(self, user_id: int) -> str | None:
+        # every writer of a user's tokens takes the owner's row lock first: a rotation moves the row
+        # to another partition, which fails a concurrent update or delete waiting on that row.
+        # The lock is a statement of its own, so the next one runs with a snapshot taken after it
+        stmt = select(User.username).where(User.id == user_id).with_for_update(key_share=True)
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    @timed_query
+    async def upsert(self, data: TokenAddDTO) -> None:
+        await self._lock_owner(data.user_id)
+
+        values = data.model_dump()
+        updated = (
+            update(self.model)
+            .where(self.model.user_id == data.user_id, self.model.type == data.type)
+            .values(hashed_data=data.hashed_data, expires_at=data.expires_at, updated_at=func.now())
+            .returning(self.model.id)
+            .cte("updated")
+        )
+        inserted = select(*(literal(value, type_=self.model.__table__.c[key].type) for key, value in values.items()))
+        stmt = (
+            insert(self.model)
+            .from_select(list(values), inserted.where(~exists(select(updated.c.id))))
+            .add_cte(updated)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(stmt)
+
+    @timed_query
+    async def rotate(self, data: TokenAddDTO, presented: RefreshClaimsDTO) -> str:
+        # presented.expires_at is the token's exp in whole seconds, the stored expiry lies within
+        # that second, which keeps the lookup to a single partition of the hash index
+        username = await self._lock_owner(data.user_id)
+        if username is None:
+            raise ObjectNotFoundError
+        stmt = (
+            update(self.model)
+            .where(
+                self.model.user_id == data.user_id,
+                self.model.type == data.type,
+                self.model.hashed_data == presented.hashed_data,
+                self.model.expires_at >= presented.expires_at,
+                self.model.expires_at < presented.expires_at + timedelta(seconds=1),
+            )
+            .values(hashed_data=data.hashed_data, expires_at=data.expires_at)
+            .returning(self.model.id)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.session.execute(stmt)
+        if result.scalar_one_or_none() is None:
+            raise ObjectNotFoundError
+        return username
+
+    @timed_query
+    async def delete_by_user(self, user_id: int) -> None:
+        await self._lock_owner(user_id)
+        await self.delete(False, user_id=user_id)
+
+    @timed_query
+    async def delete_expired(self, before: datetime, after_id: int = 0, limit: int = 1000) -> list[int]:
+        # walks the primary key, so a whole pass reads the table once without an expires_at index
+        expired = (
+            select(self.model.id)
+            .where(self.model.id > after_id, self.model.expires_at < before)
+            .order_by(self.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            delete(self.model)
+            .where(self.model.id.in_(expired.scalar_subquery()), self.model.expires_at < before)
+            .returning(self.model.id)
+        )
+        result = await self.session.execute(stmt)
+        return sorted(result.scalars().all())
@@ -1,12 +1,20 @@
-from typing import Generic, Sequence
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import Enum
+from functools import wraps
+from itertools import islice
+from typing import AsyncIterator, Awaitable, Callable, Concatenate, Generic, Iterable, Iterator, ParamSpec, Sequence, TypeVar
 
 from asyncpg import (
     CheckViolationError,
     DataError,
     ForeignKeyViolationError,
+    IntegrityConstraintViolationError,
     UniqueViolationError,
 )
-from sqlalchemy import delete, insert, select, update
+from asyncpg import Connection as AsyncpgConnection
+from sqlalchemy import delete, func, insert, select, update
 from sqlalchemy.exc import DBAPIError, IntegrityError, NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -19,6 +27,55 @@ from src.utils.exceptions import (
     RelatedObjectExistsError,
     ValueOutOfRangeError,
 )
+from src.utils.metrics import REPO_QUERY_SECONDS
+from src.utils.server_timing import timing
+
+BaseSchemaType = TypeVar("BaseSchemaType", bound=BaseDTO)
+# the PostgreSQL protocol limit on bind parameters in one statement
+MAX_BIND_PARAMS = 32767
+RepoType = TypeVar("RepoType", bound="BaseRepo")
+ResultType = TypeVar("ResultType")
+P = ParamSpec("P")
+
+
+# set while a repository method is timed, the methods it calls are part of that observation
+_timed: ContextVar[bool] = ContextVar("timed_query", default=False)
+
+
+def timed_query(
+    method: Callable[Concatenate[RepoType, P], Awaitable[ResultType]],
+) -> Callable[Concatenate[RepoType, P], Awaitable[ResultType]]:
+    @wraps(method)
+    async def wrapper(self: RepoType, *args: P.args, **kwargs: P.kwargs) -> ResultType:
+        if _timed.get():
+            return await method(self, *args, **kwargs)
+        token = _timed.set(True)
+        try:
+            with REPO_QUERY_SECONDS.time(repo=type(self).__name__, method=method.__name__), timing("db"):
+                return await method(self, *args, **kwargs)
+        finally:
+            _timed.reset(token)
+
+    return wrapper
+
+
+class _StepTimer:
+    # one observation for work spread over several awaits, such as the batches of a streamed result
+    def __init__(self, repo: str, method: str) -> None:
+        self.labels = {"repo": repo, "method": method}
+        self.elapsed = 0.0
+
+    @contextmanager
+    def step(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            with timing("db"):
+                yield
+        finally:
+            self.elapsed += time.perf_counter() - started
+
+    def observe(self) -> None:
+        REPO_QUERY_SECONDS.observe(self.elapsed, **self.labels)
 
 
 class BaseRepo(Generic[ModelType, SchemaType]):
@@ -26,37 +83,108 @@ class BaseRepo(Generic[ModelType, SchemaType]):
     schema: type[SchemaType]
     mapper = DataMapper
 
-    def __handle_integrity_error(self, exc: IntegrityError) -> None:
-        if exc.orig and isinstance(exc.orig.__cause__, UniqueViolationError):
+    def __handle_integrity_error(self, exc: IntegrityError | IntegrityConstraintViolationError) -> None:
+        # COPY goes straight through asyncpg, so its errors are not wrapped by SQLAlchemy
+        cause = exc if isinstance(exc, IntegrityConstraintViolationError) else exc.orig and exc.orig.__cause__
+        if isinstance(cause, UniqueViolationError):
             raise ObjectAlreadyExistsError from exc
-        if exc.orig and isinstance(exc.orig.__cause__, CheckViolationError):
+        if isinstance(cause, CheckViolationError):
             raise ObjectInvalidValueError from exc
-        if exc.orig and isinstance(exc.orig.__cause__, ForeignKeyViolationError):
+        if isinstance(cause, ForeignKeyViolationError):
             raise ObjectNotFoundError from exc
 
-    def __init__(self, session: AsyncSession) -> None:
+    def __init__(self, session: AsyncSession, get_read_session: Callable[[], AsyncSession | None] | None = None) -> None:
         self.session = session
+        self._get_read_session = get_read_session
+
+    @property
+    def read_session(self) -> AsyncSession:
+        # plain reads may go to a replica, everything else stays on the primary session
+        if self._get_read_session is not None:
+            read_session = self._get_read_session()
+            if read_session is not None:
+                return read_session
+        return self.session
+
+    def _reader(self, primary: bool) -> AsyncSession:
+        # primary=True for reads that must see every committed write, such as credentials and tokens
+        return self.session if primary else self.read_session
 
+    def _columns(self, schema: type[BaseDTO] | None = None) -> list:
+        schema = schema or self.schema
+        return [getattr(self.model, field) for field in schema.model_fields]
+
+    def _select(self, schema: type[BaseDTO] | None = None):
+        return select(*self._columns(schema))
+
+    @timed_query
     async def get_all_filtered(self, *filter, **filter_by) -> list[SchemaType]:
         query = (
-            select(self.model).filter(*filter).filter_by(**filter_by).order_by(self.model.id)  # type: ignore
+            self._select().filter(*filter).filter_by(**filter_by).order_by(self.model.id)  # type: ignore
         )
         try:
-            result = await self.session.execute(query)
+            result = await self.read_session.execute(query)
         except DBAPIError as exc:
             if exc.orig and isinstance(exc.orig.__cause__, DataError):
                 raise ValueOutOfRangeError(detail=exc.orig.__cause__.args[0]) from exc
             raise exc
-        return [self.mapper.map_to_domain_entity(item) for item in result.scalars().all()]
+        return [self.mapper.map_to_domain_entity(item) for item in result.mappings().all()]
 
+    @timed_query
+    async def get_page(self, *filter, after_id: int | None = None, limit: int = 100, **filter_by) -> list[SchemaType]:
+        query = self._select().filter(*filter).filter_by(**filter_by)
+        if after_id is not None:
+            query = query.filter(self.model.id > after_id)  # type: ignore
+        query = query.order_by(self.model.id).limit(limit)  # type: ignore
+        try:
+            result = await self.read_session.execute(query)
+        except DBAPIError as exc:
+            if exc.orig and isinstance(exc.orig.__cause__, DataError):
+                raise ValueOutOfRangeError(detail=exc.orig.__cause__.args[0]) from exc
+            raise exc
+        return [self.mapper.map_to_domain_entity(item) for item in result.mappings().all()]
+
+    async def stream_filtered(self, *filter, batch_size: int = 1000, **filter_by) -> AsyncIterator[list[SchemaType]]:
+        query = (
+            self._select()
+            .filter(*filter)
+            .filter_by(**filter_by)
+            .order_by(self.model.id)  # type: ignore
+            .execution_options(yield_per=batch_size)
+        )
+        # the time the consumer spends between batches is not counted
+        timer = _StepTimer(type(self).__name__, "stream_filtered")
+        try:
+            with timer.step():
+                result = await self.session.stream(query)
+        except DBAPIError as exc:
+            timer.observe()
+            if exc.orig and isinstance(exc.orig.__cause__, DataError):
+                raise ValueOutOfRangeError(detail=exc.orig.__cause__.args[0]) from exc
+            raise exc
+        partitions = result.mappings().partitions()
+        try:
+            while True:
+                with timer.step():
+                    partition = await anext(partitions, None)
+                if partition is None:
+                    break
+                yield [self.mapper.map_to_domain_entity(item) for item in partition]
+        finally:
+            with timer.step():
+                await result.close()
+            timer.observe()
+
+    @timed_query
     async def get_all(self) -> list[SchemaType]:
         return await self.get_all_filtered()
 
-    async def get_one_or_none(self, *filter, **filter_by) -> SchemaType | None:
-        query = select(self.model).filter(*filter).filter_by(**filter_by)
+    @timed_query
+    async def get_one_or_none(self, *filter, primary: bool = False, **filter_by) -> SchemaType | None:
+        query = self._select().filter(*filter).filter_by(**filter_by)
         try:
-            result = await self.session.execute(query)
-            obj = result.scalars().one_or_none()
+            result = await self._reader(primary).execute(query)
+            obj = result.mappings().one_or_none()
         except DBAPIError as exc:
             if exc.orig and isinstance(exc.orig.__cause__, DataError):
                 raise ValueOutOfRangeError(detail=exc.orig.__cause__.args[0]) from exc
@@ -66,11 +194,22 @@ class BaseRepo(Generic[ModelType, SchemaType]):
             return None
         return self.mapper.map_to_domain_entity(obj)
 
-    async def get_one(self, *filter, **filter_by) -> SchemaType:
-        query = select(self.model).filter(*filter).filter_by(**filter_by)
+    @timed_query
+    async def get_one(self, *filter, primary: bool = False, **filter_by) -> SchemaType:
+        return await self.get_one_as(self.schema, *filter, primary=primary, **filter_by)
+
+    @timed_query
+    async def get_one_as(
+        self,
+        schema: type[BaseSchemaType],
+        *filter,
+        primary: bool = False,
+        **filter_by,
+    ) -> BaseSchemaType:
+        query = self._select(schema).filter(*filter).filter_by(**filter_by)
         try:
-            result = await self.session.execute(query)
-            obj = result.scalar_one()
+            result = await self._reader(primary).execute(query)
+            obj = result.mappings().one()
         except NoResultFound:
             raise ObjectNotFoundError
         except DBAPIError as exc:
@@ -78,18 +217,78 @@ class BaseRepo(Generic[ModelType, SchemaType]):
                 raise ValueOutOfRangeError(detail=exc.orig.__cause__.args[0]) from exc
             raise exc
 
-        return self.mapper.map_to_domain_entity(obj)
+        return self.mapper.map_to_domain_entity(obj, schema=schema)
 
+    @timed_query
     async def add_bulk(self, data: Sequence[BaseDTO]) -> list[SchemaType]:
-        add_obj_stmt = insert(self.model).values([item.model_dump() for item in data]).returning(self.model)
-        try:
-            result = await self.session.execute(add_obj_stmt)
-        except IntegrityError as exc:
-            self.__handle_integrity_error(exc)
-            raise exc
-        objs = result.scalars().all()
+        # rows are returned, so this stays an INSERT; copy_bulk is faster for large loads that need only ids
+        rows = [item.model_dump() for item in data]
+        if not rows:
+            return []
+        chunk_size = max(MAX_BIND_PARAMS // len(rows[0]), 1)
+        objs = []
+        for start in range(0, len(rows), chunk_size):
+            add_obj_stmt = insert(self.model).values(rows[start : start + chunk_size]).returning(self.model)
+            try:
+                result = await self.session.execute(add_obj_stmt)
+            except IntegrityError as exc:
+                self.__handle_integrity_error(exc)
+                raise exc
+            objs += result.scalars().all()
         return [self.mapper.map_to_domain_entity(item) for item in objs]
 
+    @timed_query
+    async def copy_bulk(
+        self,
+        data: Iterable[BaseDTO],
+        return_ids: bool = False,
+        chunk_size: int = 10000,
+    ) -> list[int] | None:
+        table = self.model.__table__
+        connection = await self._driver_connection()
+        ids: list[int] = []
+        items = iter(data)
+        while rows := [item.model_dump() for item in islice(items, chunk_size)]:
+            if return_ids:
+                chunk_ids = await self._allocate_ids(len(rows))
+                for row, id in zip(rows, chunk_ids):
+                    row["id"] = id
+                ids += chunk_ids
+            columns = list(rows[0])
+            records = [tuple(self._to_copy_value(row[column]) for column in columns) for row in rows]
+            try:
+                await connection.copy_records_to_table(
+                    table.name,  # pyright: ignore
+                    records=records,
+                    columns=columns,
+                    schema_name=table.schema,  # pyright: ignore
+                )
+            except IntegrityConstraintViolationError as exc:
+                self.__handle_integrity_error(exc)
+                raise exc
+        return ids if return_ids else None
+
+    async def _driver_connection(self) -> AsyncpgConnection:
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection: AsyncpgConnection = raw_connection.driver_connection  # pyright: ignore
+        if not driver_connection.is_in_transaction():
+            # let SQLAlchemy open the transaction, so COPY commits and rolls back with the session
+            await connection.exec_driver_sql("SELECT 1")
+        return driver_connection
+
+    async def _allocate_ids(self, count: int) -> list[int]:
+        sequence = func.pg_get_serial_sequence(self.model.__table__.fullname, "id")  # pyright: ignore
+        query = select(func.nextval(sequence)).select_from(func.generate_series(1, count))
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    @staticmethod
+    def _to_copy_value(value):
+        # enum columns store member names
+        return value.name if isinstance(value, Enum) else value
+
+    @timed_query
     async def add(self, data: BaseDTO, **params) -> SchemaType:
         add_obj_stmt = insert(self.model).values(**data.model_dump(), **params).returning(self.model)
         try:
@@ -101,12 +300,14 @@ class BaseRepo(Generic[ModelType, SchemaType]):
         obj = result.scalars().one()
         return self.mapper.map_to_domain_entity(obj)
 
+    @timed_query
     async def get_one_or_add(self, data: BaseDTO, **params) -> SchemaType:
-        obj = await self.get_one_or_none(**data.model_dump())
+        obj = await self.get_one_or_none(primary=True, **data.model_dump())
         if obj is None:
             return await self.add(data, **params)
         return self.mapper.map_to_domain_entity(obj)
 
+    @timed_query
     async def edit(
         self,
         data: SchemaType,
@@ -117,7 +318,7 @@ class BaseRepo(Generic[ModelType, SchemaType]):
         **filter_by,
     ) -> bool:
         if ensure_existence:
-            await self.get_one(*filter, **filter_by)
+            await self.get_one(*filter, primary=True, **filter_by)
 
         exclude_fields = exclude_fields or set()
         to_update = data.model_dump(exclude=exclude_fields, exclude_unset=exclude_unset)
@@ -136,6 +337,44 @@ class BaseRepo(Generic[ModelType, SchemaType]):
             raise exc
         return True
 
+    @timed_query
+    async def edit_returning(
+        self,
+        data: BaseDTO,
+        exclude_unset=True,
+        exclude_fields=None,
+        *filter,
+        **filter_by,
+    ) -> SchemaType:
+        exclude_fields = exclude_fields or set()
+        to_update = data.model_dump(exclude=exclude_fields, exclude_unset=exclude_unset)
+        if not to_update:
+            return await self.get_one(*filter, primary=True, **filter_by)
+        edit_obj_stmt = (
+            update(self.model)
+            .filter(*filter)
+            .filter_by(**filter_by)
+            .values(**to_update)
+            .returning(*self._columns())
+            .execution_options(synchronize_session=False)
+        )
+
+        try:
+            result = await self.session.execute(edit_obj_stmt)
+        except IntegrityError as exc:
+            self.__handle_integrity_error(exc)
+            raise exc
+        except DBAPIError as exc:
+            if exc.orig and isinstance(exc.orig.__cause__, DataError):
+                raise ValueOutOfRangeError(detail=exc.orig.__cause__.args[0]) from exc
+            raise exc
+
+        obj = result.mappings().one_or_none()
+        if obj is None:
+            raise ObjectNotFoundError
+        return self.mapper.map_to_domain_entity(obj)
+
+    @timed_query
     async def delete(self, ensure_existence=True, *filter, **filter_by) -> bool:
         delete_obj_stmt = delete(self.model).filter(*filter).filter_by(**filter_by)
         try:
@@ -151,5 +390,6 @@ class BaseRepo(Generic[ModelType, SchemaType]):
             raise ObjectNotFoundError
         return True
 
+    @timed_query
     async def delete_all(self, ensure_existence=False) -> bool:
         return await self.delete(ensure_existence=ensure_existence)
@@ -1,4 +1,5 @@
-from typing import Generic, TypeVar
+from functools import cache
+from typing import Callable, ClassVar, Generic, TypeVar
 
 from sqlalchemy import Row, RowMapping
 
@@ -9,16 +10,45 @@ ModelType = TypeVar("ModelType", bound=Base)
 SchemaType = TypeVar("SchemaType", bound=BaseDTO)
 
 
+@cache
+def _trusted_converter(schema: type[BaseDTO]) -> Callable[[RowMapping], BaseDTO]:
+    fields = frozenset(schema.model_fields)
+    if schema.__private_attributes__ or schema.__pydantic_post_init__ or schema.model_config.get("extra") == "allow":
+        return lambda row: schema.model_construct(set(fields), **row)
+
+    # same state model_construct() leaves behind, without its per-field default handling
+    new = object.__new__
+    setattr_ = object.__setattr__
+
+    def convert(row: RowMapping) -> BaseDTO:
+        obj = new(schema)
+        setattr_(obj, "__dict__", dict(row))
+        setattr_(obj, "__pydantic_fields_set__", set(fields))
+        setattr_(obj, "__pydantic_extra__", None)
+        setattr_(obj, "__pydantic_private__", None)
+        return obj
+
+    return convert
+
+
 class DataMapper(Generic[ModelType, SchemaType]):
     model: type[ModelType]
     schema: type[SchemaType]
+    # rows selected from our own tables skip revalidation
+    trusted: ClassVar[bool] = False
 
     @classmethod
     def map_to_domain_entity(
         cls,
         db_model: ModelType | dict | Row | RowMapping,
+        schema: type[BaseDTO] | None = None,
     ) -> SchemaType:
-        return cls.schema.model_validate(db_model)
+        schema = schema or cls.schema
+        if isinstance(db_model, RowMapping):
+            if cls.trusted:
+                return _trusted_converter(schema)(db_model)  # pyright: ignore
+            db_model = dict(db_model)
+        return schema.model_validate(db_model)  # pyright: ignore
 
     @classmethod
     def map_to_persistence_entity(
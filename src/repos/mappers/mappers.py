@@ -6,8 +6,10 @@ from src.schemas.auth import TokenDTO, UserDTO
 class AuthMapper(DataMapper[User, UserDTO]):
     model = User
     schema = UserDTO
+    trusted = True
 
 
 class TokenMapper(DataMapper[Token, TokenDTO]):
     model = Token
     schema = TokenDTO
+    trusted = True
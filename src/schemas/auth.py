@@ -67,6 +67,12 @@ class TokenDTO(TokenAddDTO):
     id: int
 
 
+class RefreshClaimsDTO(BaseDTO):
+    user_id: int
+    hashed_data: str
+    expires_at: datetime
+
+
 class TokenResponseDTO(BaseDTO):
     access_token: str
     refresh_token: str
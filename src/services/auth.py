@@ -1,14 +1,15 @@
 import hashlib
 from datetime import datetime, timedelta
+from typing import AsyncIterator
 
-import bcrypt
 import jwt
 from fastapi import Response
-from jwt.exceptions import DecodeError, ExpiredSignatureError
+from jwt.exceptions import ExpiredSignatureError, InvalidTokenError
 
 from src.config import settings
 from src.schemas.auth import (
     CreatedTokenDTO,
+    RefreshClaimsDTO,
     TokenAddDTO,
     TokenResponseDTO,
     TokenType,
@@ -29,7 +30,12 @@ from src.utils.exceptions import (
     TokenExipedError,
     UserExistsHTTPError,
     UserNotFoundError,
+    WithdrawnTokenError,
 )
+from src.utils.hashing import hash_password, password_hasher, verify_password
+from src.utils.metrics import TOKEN_OPERATION_SECONDS
+from src.utils.server_timing import timing
+from src.utils.signers import key_store
 
 
 class TokenService(BaseService):
@@ -44,16 +50,21 @@ class TokenService(BaseService):
         return self.hash_token(token) == hashed_token
 
     def hash_pwd(self, password: str) -> str:
-        salt = bcrypt.gensalt()
-        pwd_bytes: bytes = password.encode(encoding="utf-8")
-        hashed_pwd_bytes = bcrypt.hashpw(pwd_bytes, salt)
-        return hashed_pwd_bytes.decode(encoding="utf-8")
+        with TOKEN_OPERATION_SECONDS.time(operation="hash_pwd"), timing("bcrypt"):
+            return hash_password(password)
 
     def verify_pwd(self, password: str, hashed_password: str) -> bool:
-        return bcrypt.checkpw(
-            password=password.encode(encoding="utf-8"),
-            hashed_password=hashed_password.encode(encoding="utf-8"),
-        )
+        with TOKEN_OPERATION_SECONDS.time(operation="verify_pwd"), timing("bcrypt"):
+            return verify_password(password, hashed_password)
+
+    # includes the wait for a free hashing worker
+    async def hash_pwd_async(self, password: str) -> str:
+        with TOKEN_OPERATION_SECONDS.time(operation="hash_pwd"), timing("bcrypt"):
+            return await password_hasher.hash(password)
+
+    async def verify_pwd_async(self, password: str, hashed_password: str) -> bool:
+        with TOKEN_OPERATION_SECONDS.time(operation="verify_pwd"), timing("bcrypt"):
+            return await password_hasher.verify(password, hashed_password)
 
     def _generate_token(
         self,
@@ -70,11 +81,8 @@ class TokenService(BaseService):
         token_data["iat"] = datetime.timestamp(now)
         token_data["type"] = type
 
-        token = jwt.encode(
-            payload=token_data,
-            key=settings.auth.JWT_PRIVATE_KEY.read_text(),
-            algorithm=settings.auth.JWT_ALGORITHM,
-        )
+        with TOKEN_OPERATION_SECONDS.time(operation="generate_token"), timing("sign"):
+            token = key_store.signer_for(type).sign(token_data)
 
         return CreatedTokenDTO(
             token=token,
@@ -97,44 +105,51 @@ class TokenService(BaseService):
         )
 
     def decode_token(self, token: str) -> dict:
-        try:
-            decoded_token = jwt.decode(
-                jwt=token,
-                key=settings.auth.JWT_PUBLIC_KEY.read_text(),
-                algorithms=[settings.auth.JWT_ALGORITHM],
-            )
-        except ExpiredSignatureError as exc:
-            raise TokenExipedError from exc
-        except DecodeError as exc:
-            raise CannotDecodeTokenError from exc
+        with TOKEN_OPERATION_SECONDS.time(operation="decode_token"), timing("decode"):
+            try:
+                kid = jwt.get_unverified_header(token).get("kid")
+                verification_key = key_store.get_verification_key(kid)
+                if verification_key is None:
+                    raise CannotDecodeTokenError
+                decoded_token = jwt.decode(
+                    jwt=token,
+                    key=verification_key.key,
+                    algorithms=[verification_key.algorithm],
+                )
+            except ExpiredSignatureError as exc:
+                raise TokenExipedError from exc
+            except InvalidTokenError as exc:
+                raise CannotDecodeTokenError from exc
         return decoded_token
 
     async def update_tokens(
         self,
         response: Response,
-        uid: int | None = None,
-        user: UserDTO | UserWithPasswordDTO | None = None,  # pyright: ignore
+        claims: RefreshClaimsDTO | None = None,
+        user: UserDTO | UserWithPasswordDTO | None = None,
     ) -> TokenResponseDTO:
-        if user is None:
-            user: UserWithPasswordDTO = await self.db.auth.get_one(id=uid)  # pyright: ignore
-
-        access_token = self.create_access_token(payload={"username": user.username, "sub": f"{user.id}"})
-        refresh_token = self.create_refresh_token(payload={"sub": f"{user.id}"})
-
+        user_id = user.id if user is not None else claims.user_id  # pyright: ignore
+        refresh_token = self.create_refresh_token(payload={"sub": f"{user_id}"})
         hashed_refresh_token = self.hash_token(refresh_token.token)
 
         token_to_update = TokenAddDTO(
             hashed_data=hashed_refresh_token,
-            user_id=user.id,
+            user_id=user_id,  # pyright: ignore
             **refresh_token.model_dump(exclude={"token"}),
         )
-        await self.db.tokens.delete(
-            user_id=user.id,
-            ensure_existence=False,
-        )
-        await self.db.tokens.add(token_to_update)
+        if user is None:
+            # rotation only succeeds while the refresh token is still stored
+            try:
+                username = await self.db.tokens.rotate(token_to_update, presented=claims)  # pyright: ignore
+            except ObjectNotFoundError as exc:
+                raise WithdrawnTokenError from exc
+        else:
+            await self.db.tokens.upsert(token_to_update)
+            username = user.username
         await self.db.commit()
 
+        access_token = self.create_access_token(payload={"username": username, "sub": f"{user_id}"})
+
         response.set_cookie(
             key=settings.auth.REFRESH_TOKEN_COOKIE_KEY,
             value=refresh_token.token,
@@ -147,10 +162,7 @@ class TokenService(BaseService):
         )
 
     async def delete_tokens(self, uid: int) -> None:
-        await self.db.tokens.delete(
-            user_id=uid,
-            ensure_existence=False,
-        )
+        await self.db.tokens.delete_by_user(uid)
         await self.db.commit()
 
 
@@ -165,14 +177,14 @@ class AuthService(BaseService):
             raise InvalidLoginDataError from exc
 
         token_service = TokenService(self.db)
-        is_same = token_service.verify_pwd(login_data.password, user.hashed_password)
+        is_same = await token_service.verify_pwd_async(login_data.password, user.hashed_password)
         if not user or not is_same:
             raise InvalidLoginDataError
 
         return await token_service.update_tokens(user=user, response=response)
 
     async def register_user(self, register_data: UserRegisterDTO) -> UserDTO:
-        hashed_password = TokenService(self.db).hash_pwd(register_data.password)
+        hashed_password = await TokenService(self.db).hash_pwd_async(register_data.password)
         user_to_add = UserAddDTO(
             hashed_password=hashed_password,
             **register_data.model_dump(exclude={"password"}),
@@ -186,11 +198,24 @@ class AuthService(BaseService):
 
     async def get_profile(self, uid: int) -> UserDTO:
         try:
-            return await self.db.auth.get_user_with_passwd(id=uid)
+            return await self.db.auth.get_one(id=uid)
         except ObjectNotFoundError as exc:
             raise UserNotFoundError from exc
 
     async def update_profile(self, uid: int, data: UserUpdateDTO) -> UserDTO:
-        await self.db.auth.edit(id=uid, data=data, ensure_existence=False)  # pyright: ignore
+        try:
+            user = await self.db.auth.edit_returning(data, id=uid)
+        except ObjectNotFoundError as exc:
+            raise UserNotFoundError from exc
         await self.db.commit()
-        return await self.db.auth.get_one(id=uid)
+        return user
+
+    async def iter_users(self, batch_size: int = 1000) -> AsyncIterator[list[UserDTO]]:
+        # keyset pages rather than one cursor: a slow client keeps no transaction open,
+        # and the connection goes back to the pool between pages
+        after_id = None
+        while users := await self.db.auth.get_page(after_id=after_id, limit=batch_size):
+            # nothing was written, this only releases the connection
+            await self.db.rollback()
+            yield users
+            after_id = users[-1].id
@@ -0,0 +1,130 @@
+"""
+Bulk import users from a CSV or NDJSON file.
+
+Every record needs "username" and "password" and is validated like a
+registration request. Passwords are hashed in a process pool and users are
+loaded with COPY, one transaction per batch.
+
+    python -m src.tools.import_users users.csv --workers 8 --batch-size 2000
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import suppress
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Iterator
+
+from pydantic import ValidationError
+
+from src.db import sessionmaker_null_pool
+from src.schemas.auth import UserAddDTO, UserRegisterDTO
+from src.utils.db_tools import DBManager
+from src.utils.exceptions import ObjectAlreadyExistsError, ObjectInvalidValueError
+from src.utils.hashing import hash_password
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    invalid: int = 0
+    imported: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        return self.imported / self.seconds if self.seconds else 0.0
+
+
+def read_records(path: Path, format: str) -> Iterator[dict]:
+    with open(path, newline="", encoding="utf-8") as f:
+        if format == "csv":
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_users(path: Path, format: str, stats: ImportStats) -> Iterator[UserRegisterDTO]:
+    for number, record in enumerate(read_records(path, format), start=1):
+        stats.read += 1
+        try:
+            yield UserRegisterDTO.model_validate(record)
+        except ValidationError as exc:
+            stats.invalid += 1
+            logger.warning("Skipping record %d: %s", number, exc.errors(include_url=False))
+
+
+async def hash_batch(executor: Executor, users: list[UserRegisterDTO]) -> list[UserAddDTO]:
+    # same hashing TokenService.hash_pwd does, spread over worker processes
+    loop = asyncio.get_running_loop()
+    hashed_passwords = await asyncio.gather(*(loop.run_in_executor(executor, hash_password, user.password) for user in users))
+    return [
+        UserAddDTO(username=user.username, hashed_password=hashed_password)
+        for user, hashed_password in zip(users, hashed_passwords)
+    ]
+
+
+async def import_users(path: Path, format: str, workers: int, batch_size: int) -> ImportStats:
+    stats = ImportStats()
+    started = time.perf_counter()
+    users = read_users(path, format, stats)
+
+    # spawned workers do not inherit the event loop or the threads of this process
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        async with DBManager(session_factory=sessionmaker_null_pool) as db:
+            # hash the next batch while the current one is being loaded
+            next_batch = asyncio.ensure_future(hash_batch(executor, list(islice(users, batch_size))))
+            try:
+                while batch := await next_batch:
+                    next_batch = asyncio.ensure_future(hash_batch(executor, list(islice(users, batch_size))))
+                    try:
+                        await db.auth.copy_bulk(batch)
+                        await db.commit()
+                    except (ObjectAlreadyExistsError, ObjectInvalidValueError):
+                        await db.rollback()
+                        raise
+                    stats.imported += len(batch)
+                    logger.info("Imported %d users", stats.imported)
+            finally:
+                # whatever stopped the import, the prefetched batch is not left running in the pool
+                next_batch.cancel()
+                with suppress(asyncio.CancelledError, Exception):
+                    await next_batch
+
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", type=Path, help="CSV file with a header row or NDJSON file")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="file format, guessed from the extension by default")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="hashing processes")
+    parser.add_argument("--batch-size", type=int, default=1000, help="users per COPY and transaction")
+    args = parser.parse_args()
+
+    format = args.format or ("csv" if args.path.suffix.lower() == ".csv" else "ndjson")
+    try:
+        stats = asyncio.run(import_users(args.path, format, args.workers, args.batch_size))
+    except (ObjectAlreadyExistsError, ObjectInvalidValueError) as exc:
+        sys.exit(f"Import stopped, the failed batch was rolled back: {exc.detail}")
+
+    print(f"read: {stats.read}, invalid: {stats.invalid}, imported: {stats.imported}")
+    print(f"{stats.seconds:.2f}s, {stats.rate:.0f} users/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, TypeVar
+
+from src.utils.metrics import CACHE_LOOKUPS
+
+KeyType = TypeVar("KeyType", bound=Hashable)
+ValueType = TypeVar("ValueType")
+
+
+class TTLCache(Generic[KeyType, ValueType]):
+    def __init__(self, maxsize: int, clock: Callable[[], float] = time.time, name: str | None = None) -> None:
+        self.maxsize = maxsize
+        # lookups are exported on /metrics under this name
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._items: OrderedDict[KeyType, tuple[float, ValueType]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: KeyType) -> ValueType | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] <= self._clock():
+                del self._items[key]
+                item = None
+            if item is None:
+                self.misses += 1
+            else:
+                self._items.move_to_end(key)
+                self.hits += 1
+        if self.name is not None:
+            CACHE_LOOKUPS.inc(cache=self.name, result="miss" if item is None else "hit")
+        return None if item is None else item[1]
+
+    def set(self, key: KeyType, value: ValueType, expires_at: float) -> None:
+        if self.maxsize <= 0 or expires_at <= self._clock():
+            return
+        with self._lock:
+            self._items[key] = (expires_at, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
@@ -1,38 +1,94 @@
-from typing import Self
+import asyncio
+import re
+import time
+from contextlib import AsyncExitStack
+from datetime import datetime, timedelta
+from functools import cached_property
+from typing import Callable, Self
 
-from sqlalchemy import Connection, inspect, text
-from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from asyncpg import LockNotAvailableError
+from sqlalchemy import Connection, func, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession, async_sessionmaker
 
+from src.db import EngineRouter
+from src.models.auth import Token
 from src.models.base import Base
 from src.repos.auth import AuthRepo, TokenRepo
-from src.utils.exceptions import MissingTablesError
+from src.schemas.auth import TokenType
+from src.utils.exceptions import MissingTablesError, ObjectNotFoundError
 from src.utils.logging import get_logger
+from src.utils.metrics import TOKENS_PARTITIONS, TOKENS_PURGE_LAST_RUN_SECONDS, TOKENS_PURGE_RUNS, TOKENS_PURGED
+from src.utils.server_timing import timing
 
 logger = get_logger(__name__)
 
+# pg_advisory_lock key shared by every worker, only the holder purges expired tokens
+TOKENS_PURGE_LOCK_KEY = 0x746F6B656E73
+# attaching and dropping partitions lock tokens and users, give up instead of queueing requests behind them
+TOKENS_PARTITION_LOCK_TIMEOUT = "1s"
+_PARTITION_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
 
 class DBManager:
-    def __init__(self, session_factory: async_sessionmaker) -> None:
+    def __init__(self, session_factory: async_sessionmaker, replica_router: EngineRouter | None = None) -> None:
         self.session_factory = session_factory
+        self.replica_router = replica_router
+        self._committed = False
 
     async def __aenter__(self) -> Self:
-        self.session: AsyncSession = self.session_factory()
-        self.auth = AuthRepo(self.session)
-        self.tokens = TokenRepo(self.session)
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        replica_session: AsyncSession | None = self.__dict__.get("replica_session")
+        if replica_session is not None:
+            await replica_session.close()
+        session: AsyncSession | None = self.__dict__.get("session")
+        if session is None:
+            return
         await self.rollback()
-        await self.session.close()
+        await session.close()
+
+    # nothing is created until a repository is used, requests that never query pay nothing
+    @cached_property
+    def session(self) -> AsyncSession:
+        return self.session_factory()
+
+    @cached_property
+    def replica_session(self) -> AsyncSession:
+        return AsyncSession(bind=self.replica_router.choose(), autoflush=False, expire_on_commit=False)  # pyright: ignore
+
+    @cached_property
+    def auth(self) -> AuthRepo:
+        return AuthRepo(self.session, self._get_read_session)
+
+    @cached_property
+    def tokens(self) -> TokenRepo:
+        return TokenRepo(self.session, self._get_read_session)
+
+    def _get_read_session(self) -> AsyncSession | None:
+        if self.replica_router is None or self._committed:
+            return None
+        # read your own writes: a replica may not have them yet
+        session: AsyncSession | None = self.__dict__.get("session")
+        if session is not None and session.in_transaction():
+            return None
+        return self.replica_session
 
     async def check_connection(self) -> None:
         await self.session.execute(text("SELECT version();"))
 
     async def commit(self) -> None:
-        await self.session.commit()
+        # the session gives its connection back to the pool as soon as the transaction ends
+        with timing("db"):
+            await self.session.commit()
+        self._committed = True
 
     async def rollback(self) -> None:
-        await self.session.rollback()
+        for name in ("session", "replica_session"):
+            session: AsyncSession | None = self.__dict__.get(name)
+            if session is not None and session.in_transaction():
+                await session.rollback()
 
 
 class DBHealthChecker:
@@ -64,3 +120,188 @@ class DBHealthChecker:
             logger.info("Extra tables: %s", ", ".join(map(repr, extra_tables)))
 
         return len(missing_tables) == 0, missing_tables
+
+
+class DBWarmer:
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+
+    async def warm_up(self, connections: int) -> None:
+        capacity = self._pool_capacity()
+        if capacity is not None and connections > capacity:
+            # more would wait for pool_timeout and fail the startup
+            logger.warning("Warming up %d database connections, the pool holds no more than that", capacity)
+            connections = capacity
+        # hold every connection at once, otherwise the pool would hand out the same one again
+        async with AsyncExitStack() as stack:
+            opened = await asyncio.gather(*(stack.enter_async_context(self.engine.connect()) for _ in range(connections)))
+            await asyncio.gather(*(self._prepare_statements(connection) for connection in opened))
+        logger.info("Warmed up %d database connections", connections)
+
+    def _pool_capacity(self) -> int | None:
+        # pool_size + max_overflow of a queue pool, None when the pool has no limit
+        pool = self.engine.pool
+        size = getattr(pool, "size", None)
+        max_overflow = getattr(pool, "_max_overflow", None)
+        if size is None or max_overflow is None or max_overflow < 0:
+            return None
+        return size() + max_overflow
+
+    async def _prepare_statements(self, connection: AsyncConnection) -> None:
+        # the same statements the request handlers run, so asyncpg caches them on this connection
+        async with AsyncSession(bind=connection) as session:
+            await AuthRepo(session).get_one_or_none(id=0)
+            try:
+                await AuthRepo(session).get_user_with_passwd(username="")
+            except ObjectNotFoundError:
+                pass
+            try:
+                await TokenRepo(session).get_valid(0, TokenType.REFRESH, expires_after=datetime.now())
+            except ObjectNotFoundError:
+                pass
+            await session.rollback()
+
+
+class ExpiredTokensPurger:
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        batch_size: int = 1000,
+        max_batches_per_second: float = 10.0,
+        partition_interval: timedelta = timedelta(days=7),
+        partitions_ahead: timedelta = timedelta(days=45),
+        clock: Callable[[], datetime] = datetime.now,
+    ) -> None:
+        self.engine = engine
+        self.batch_size = batch_size
+        self.max_batches_per_second = max_batches_per_second
+        self.partition_interval = partition_interval
+        self.partitions_ahead = partitions_ahead
+        self.clock = clock
+        self.runs = 0
+        self.skipped_runs = 0
+        self.failed_runs = 0
+        self.batches = 0
+        self.deleted = 0
+        self.partitions_created = 0
+        self.partitions_dropped = 0
+        self.last_run_seconds = 0.0
+
+    async def run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.purge()
+            except Exception:
+                # a failed run is retried on the next tick instead of stopping the schedule
+                self.failed_runs += 1
+                TOKENS_PURGE_RUNS.inc(result="failed")
+                logger.exception("Expired tokens purge failed")
+
+    async def purge(self) -> int | None:
+        async with self.engine.connect() as conn:
+            locked = await conn.scalar(select(func.pg_try_advisory_lock(TOKENS_PURGE_LOCK_KEY)))
+            await conn.commit()
+            if not locked:
+                # another worker is purging right now
+                self.skipped_runs += 1
+                TOKENS_PURGE_RUNS.inc(result="skipped")
+                logger.debug("Expired tokens purge is running in another worker")
+                return None
+            started = time.perf_counter()
+            try:
+                await self._maintain_partitions(conn)
+                # rows expiring inside the current partition and in the default one
+                deleted = await self._delete_batches(conn)
+            finally:
+                await conn.rollback()
+                await conn.scalar(select(func.pg_advisory_unlock(TOKENS_PURGE_LOCK_KEY)))
+                await conn.commit()
+
+        self.runs += 1
+        self.deleted += deleted
+        self.last_run_seconds = time.perf_counter() - started
+        TOKENS_PURGE_RUNS.inc(result="completed")
+        TOKENS_PURGED.inc(deleted)
+        TOKENS_PURGE_LAST_RUN_SECONDS.set(self.last_run_seconds)
+        logger.info("Purged %d expired tokens in %.2fs", deleted, self.last_run_seconds)
+        return deleted
+
+    async def _delete_batches(self, conn: AsyncConnection) -> int:
+        before = self.clock()
+        min_batch_seconds = 1 / self.max_batches_per_second if self.max_batches_per_second > 0 else 0.0
+        deleted = after_id = 0
+        # every batch is its own short transaction, so row locks and WAL stay small
+        async with AsyncSession(bind=conn) as session:
+            repo = TokenRepo(session)
+            while True:
+                started = time.perf_counter()
+                ids = await repo.delete_expired(before, after_id=after_id, limit=self.batch_size)
+                await session.commit()
+                self.batches += 1
+                deleted += len(ids)
+                if len(ids) < self.batch_size:
+                    return deleted
+                after_id = ids[-1]
+                await asyncio.sleep(max(0.0, min_batch_seconds - (time.perf_counter() - started)))
+
+    async def _maintain_partitions(self, conn: AsyncConnection) -> None:
+        now = self.clock()
+        table = Token.__tablename__
+        result = await conn.execute(
+            text(
+                "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = CAST(:table AS regclass)"
+            ),
+            {"table": table},
+        )
+        partitions = []
+        for name, bound in result.all():
+            match = _PARTITION_BOUND_RE.search(bound)
+            if match is not None:
+                partitions.append((name, datetime.fromisoformat(match[1]), datetime.fromisoformat(match[2])))
+        await conn.commit()
+
+        lower = max((upper for _, _, upper in partitions), default=now.replace(hour=0, minute=0, second=0, microsecond=0))
+        while lower < now + self.partitions_ahead:
+            upper = lower + self.partition_interval
+            await self._create_partition(conn, f"{table}_p{lower:%Y%m%d}", lower, upper)
+            lower = upper
+
+        for name, _, upper in partitions:
+            if upper <= now:
+                await self._drop_partition(conn, name)
+
+    async def _create_partition(self, conn: AsyncConnection, name: str, lower: datetime, upper: datetime) -> None:
+        table = Token.__tablename__
+        bounds = {"lower": lower, "upper": upper}
+        await conn.execute(text(f"SET LOCAL lock_timeout = '{TOKENS_PARTITION_LOCK_TIMEOUT}'"))
+        await conn.execute(text(f'CREATE TABLE "{name}" (LIKE {table} INCLUDING DEFAULTS)'))
+        # tokens that already landed in the default partition move along, otherwise the range could not be attached
+        await conn.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {table}_default WHERE expires_at >= :lower AND expires_at < :upper RETURNING *) "
+                f'INSERT INTO "{name}" SELECT * FROM moved'
+            ),
+            bounds,
+        )
+        await conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION \"{name}\" FOR VALUES FROM ('{lower}') TO ('{upper}')"))
+        await conn.commit()
+        self.partitions_created += 1
+        TOKENS_PARTITIONS.inc(action="created")
+        logger.info("Created tokens partition %s for %s - %s", name, lower, upper)
+
+    async def _drop_partition(self, conn: AsyncConnection, name: str) -> None:
+        try:
+            await conn.execute(text(f"SET LOCAL lock_timeout = '{TOKENS_PARTITION_LOCK_TIMEOUT}'"))
+            await conn.execute(text(f'DROP TABLE "{name}"'))
+            await conn.commit()
+        except DBAPIError as exc:
+            if not (exc.orig and isinstance(exc.orig.__cause__, LockNotAvailableError)):
+                raise
+            await conn.rollback()
+            logger.warning("Could not drop expired tokens partition %s, retrying on the next run", name)
+            return
+        self.partitions_dropped += 1
+        TOKENS_PARTITIONS.inc(action="dropped")
+        logger.info("Dropped expired tokens partition %s", name)
@@ -50,6 +50,18 @@ class CannotDecodeTokenError(ApplicationError):
     detail = "Cannot decode token"
 
 
+class WithdrawnTokenError(ApplicationError):
+    detail = "Withdrawn refresh token, try to login again"
+
+
+class PasswordHashingOverloadedError(ApplicationError):
+    detail = "Too many pending password hashing operations"
+
+
+class PasswordHashingTimeoutError(ApplicationError):
+    detail = "Password hashing took too long"
+
+
 class MissingTablesError(ApplicationError):
     detail = "Missing tables"
 
@@ -103,6 +115,11 @@ class MissingTokenHTTPError(ApplicationHTTPError):
     status = status.HTTP_401_UNAUTHORIZED
 
 
+class AdminRequiredHTTPError(ApplicationHTTPError):
+    detail = "Administrator rights required"
+    status = status.HTTP_403_FORBIDDEN
+
+
 class UserNotFoundHTTPError(ApplicationHTTPError):
     detail = "User not found"
     status = status.HTTP_404_NOT_FOUND
@@ -116,3 +133,13 @@ class UserExistsHTTPError(ApplicationHTTPError):
 class InvalidLoginDataHTTPError(ApplicationHTTPError):
     detail = "Invalid login data, wrong password or username"
     status = status.HTTP_401_UNAUTHORIZED
+
+
+class ServiceNotReadyHTTPError(ApplicationHTTPError):
+    detail = "Service is starting, try again later"
+    status = status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+class PasswordHashingUnavailableHTTPError(ApplicationHTTPError):
+    detail = "Service is overloaded, try again later"
+    status = status.HTTP_503_SERVICE_UNAVAILABLE
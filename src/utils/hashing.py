@@ -0,0 +1,90 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Literal
+
+import bcrypt
+
+from src.config import settings
+from src.utils.exceptions import PasswordHashingOverloadedError, PasswordHashingTimeoutError
+
+
+def hash_password(password: str) -> str:
+    salt = bcrypt.gensalt()
+    pwd_bytes: bytes = password.encode(encoding="utf-8")
+    hashed_pwd_bytes = bcrypt.hashpw(pwd_bytes, salt)
+    return hashed_pwd_bytes.decode(encoding="utf-8")
+
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    return bcrypt.checkpw(
+        password=password.encode(encoding="utf-8"),
+        hashed_password=hashed_password.encode(encoding="utf-8"),
+    )
+
+
+class PasswordHasher:
+    def __init__(
+        self,
+        executor_type: Literal["thread", "process"] = "thread",
+        max_workers: int | None = None,
+        max_pending: int = 64,
+        timeout: float | None = None,
+    ) -> None:
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor: Executor | None = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> Executor:
+        # created lazily, so every gunicorn worker gets its own pool after fork
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="pwd-hasher",
+                )
+        return self._executor
+
+    def _release(self, _: asyncio.Future) -> None:
+        self._pending -= 1
+
+    async def _submit(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= self.max_pending:
+            raise PasswordHashingOverloadedError
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._get_executor(), func, *args)
+        self._pending += 1
+        future.add_done_callback(self._release)
+        try:
+            # shield: on timeout the job keeps its pool slot until bcrypt returns
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+        except TimeoutError as exc:
+            raise PasswordHashingTimeoutError from exc
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._submit(verify_password, password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    executor_type=settings.auth.PWD_HASHING_EXECUTOR,
+    max_workers=settings.auth.PWD_HASHING_WORKERS,
+    max_pending=settings.auth.PWD_HASHING_MAX_PENDING,
+    timeout=settings.auth.PWD_HASHING_TIMEOUT,
+)
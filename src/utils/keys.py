@@ -0,0 +1,89 @@
+import base64
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Callable, Generic, TypeVar
+
+from cryptography.hazmat.primitives.asymmetric.ec import SECP256R1, EllipticCurvePublicKey
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicKey
+from cryptography.hazmat.primitives.asymmetric.types import PrivateKeyTypes, PublicKeyTypes
+from cryptography.hazmat.primitives.serialization import load_pem_private_key, load_pem_public_key
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm, RSAAlgorithm
+
+KeyType = TypeVar("KeyType")
+
+# members required by RFC 7638 to compute a JWK thumbprint
+_THUMBPRINT_MEMBERS = {
+    "RSA": ("e", "kty", "n"),
+    "EC": ("crv", "kty", "x", "y"),
+    "OKP": ("crv", "kty", "x"),
+    "oct": ("k", "kty"),
+}
+
+
+def load_private_key(data: bytes) -> PrivateKeyTypes:
+    return load_pem_private_key(data, password=None)
+
+
+def load_public_key(data: bytes) -> PublicKeyTypes:
+    return load_pem_public_key(data)
+
+
+def get_key_algorithm(key: PublicKeyTypes) -> str:
+    if isinstance(key, RSAPublicKey):
+        return "RS256"
+    if isinstance(key, EllipticCurvePublicKey) and isinstance(key.curve, SECP256R1):
+        return "ES256"
+    if isinstance(key, Ed25519PublicKey):
+        return "EdDSA"
+    raise TypeError(f"Unsupported public key type: {type(key).__name__}")
+
+
+def to_public_jwk(key: PublicKeyTypes) -> dict:
+    if isinstance(key, RSAPublicKey):
+        return RSAAlgorithm.to_jwk(key, as_dict=True)  # pyright: ignore
+    if isinstance(key, EllipticCurvePublicKey):
+        return ECAlgorithm.to_jwk(key, as_dict=True)  # pyright: ignore
+    if isinstance(key, Ed25519PublicKey):
+        return OKPAlgorithm.to_jwk(key, as_dict=True)  # pyright: ignore
+    raise TypeError(f"Unsupported public key type: {type(key).__name__}")
+
+
+def jwk_thumbprint(jwk: dict) -> str:
+    members = {name: jwk[name] for name in _THUMBPRINT_MEMBERS[jwk["kty"]]}
+    digest = hashlib.sha256(json.dumps(members, separators=(",", ":"), sort_keys=True).encode()).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+class WatchedKey(Generic[KeyType]):
+    def __init__(
+        self,
+        path: Path,
+        loader: Callable[[bytes], KeyType],
+        check_interval: float = 5.0,
+    ) -> None:
+        self.path = path
+        self.loader = loader
+        self.check_interval = check_interval
+        self.version = 0
+        self._key: KeyType | None = None
+        self._file_id: tuple[int, int, int] | None = None
+        self._checked_at = 0.0
+
+    def get(self) -> KeyType:
+        now = time.monotonic()
+        if self._key is None or now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self._reload_if_changed()
+        return self._key  # type: ignore
+
+    def _reload_if_changed(self) -> None:
+        stat = self.path.stat()
+        file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if self._key is not None and file_id == self._file_id:
+            return
+        self._key = self.loader(self.path.read_bytes())
+        self._file_id = file_id
+        self.version += 1
@@ -1,21 +1,135 @@
+import atexit
 import json
 import logging
 import logging.config
 import os
+import queue
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
+from src.config import settings
+from src.utils.metrics import LOG_RECORDS_DROPPED
+
 
 def get_logging_config() -> dict:
     basepath = Path(__file__).resolve().parent.parent.parent
     with open(basepath / "logging_config.json", "r") as f:
         config = json.load(f)
     os.makedirs(basepath / "logs", exist_ok=True)
+    if settings.logging.LOG_FORMAT == "json":
+        for handler in config["handlers"].values():
+            handler["formatter"] = "json"
     return config
 
 
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        # structured fields passed as extra={"fields": {...}}
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class BoundedQueueHandler(QueueHandler):
+    def __init__(self, maxsize: int) -> None:
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # formatting, args and exc_info are left to the listener thread and its handlers' formatters
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # a slow disk loses records instead of stalling the event loop
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.inc()
+
+
+# CPython internal, there is no public switch: Logger.findCaller is skipped while logging._srcfile is None
+_SRCFILE = logging._srcfile  # pyright: ignore
+
+
+class LogQueue:
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.handler = BoundedQueueHandler(maxsize)
+        self.listener: QueueListener | None = None
+        self._configured: dict[logging.Logger, list[logging.Handler]] = {}
+
+    @property
+    def dropped(self) -> int:
+        return self.handler.dropped
+
+    def install(self, config: dict, caller_info: bool = True) -> None:
+        # loggers keep their configured handlers, but reach them through the queue
+        self.stop()
+        logging._srcfile = _SRCFILE if caller_info else None  # pyright: ignore
+        handler_names = set(config.get("handlers", {}))
+        loggers = [logging.getLogger()] + [logging.getLogger(name) for name in config.get("loggers", {})]
+        handlers: list[logging.Handler] = []
+        self._configured = {}
+        for logger in loggers:
+            configured = [handler for handler in logger.handlers if handler.name in handler_names]
+            if not configured:
+                continue
+            self._configured[logger] = configured
+            handlers.extend(handler for handler in configured if handler not in handlers)
+            logger.handlers = [handler for handler in logger.handlers if handler not in configured] + [self.handler]
+        self._start(handlers)
+
+    def uninstall(self) -> None:
+        # writes what is queued and lets the loggers call their handlers directly again
+        self.stop()
+        for logger, configured in self._configured.items():
+            logger.handlers = [handler for handler in logger.handlers if handler is not self.handler] + configured
+        self._configured = {}
+        logging._srcfile = _SRCFILE  # pyright: ignore
+
+    def stop(self) -> None:
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def after_fork_in_child(self) -> None:
+        # the writer thread does not survive fork and the copied queue may be locked by it
+        if self.listener is None:
+            return
+        self.handler.queue = queue.Queue(self.maxsize)
+        self._start(list(self.listener.handlers))
+
+    def _start(self, handlers: list[logging.Handler]) -> None:
+        self.listener = QueueListener(self.handler.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+
+
+log_queue = LogQueue(maxsize=settings.logging.LOG_QUEUE_SIZE)
+os.register_at_fork(after_in_child=log_queue.after_fork_in_child)
+atexit.register(log_queue.stop)
+
+
 def configurate_logging() -> None:
+    caller_info = settings.logging.LOG_CALLER_INFO
+    if caller_info is None:
+        caller_info = settings.logging.LOG_FORMAT == "text"
+
     config = get_logging_config()
     logging.config.dictConfig(config)
+    log_queue.install(config, caller_info=caller_info)
 
 
 def get_logger(root_logger_name: str) -> logging.Logger:
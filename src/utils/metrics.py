@@ -0,0 +1,344 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, Literal, Mapping, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# not src.utils.logging.get_logger: the log queue reports its dropped records here
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+_FILE_PREFIX = "metrics_"
+_LABEL_ESCAPES = str.maketrans({"\\": "\\\\", "\n": "\\n", '"': '\\"'})
+
+
+class Metric:
+    type: str
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Mapping[str, object]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> list:
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def merge(self, current: Any, value: Any) -> Any:
+        # combines the samples of two processes for the same labels
+        return current + value
+
+    def value(self, merged: Any) -> float:
+        return merged
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        aggregate: Literal["sum", "latest"] = "sum",
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        # "latest": the value set most recently by any process wins, and it outlives that process
+        self.aggregate = aggregate
+        self._updated: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+            if self.aggregate == "latest":
+                self._updated[key] = time.time()
+
+    def samples(self) -> list:
+        if self.aggregate == "sum":
+            return super().samples()
+        with self._lock:
+            return [[list(key), [value, self._updated[key]]] for key, value in self._values.items()]
+
+    def merge(self, current: Any, value: Any) -> Any:
+        if self.aggregate == "sum":
+            return current + value
+        return max(current, value, key=lambda sample: sample[1])
+
+    def value(self, merged: Any) -> float:
+        return merged if self.aggregate == "sum" else merged[0]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        # per label set: a count for every bucket and +Inf, then the sum
+        self._observations: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            observations = self._observations.get(key)
+            if observations is None:
+                observations = self._observations[key] = [0.0] * (len(self.buckets) + 2)
+            observations[index] += 1
+            observations[-1] += value
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> list:
+        with self._lock:
+            return [[list(key), list(observations)] for key, observations in self._observations.items()]
+
+    def merge(self, current: Any, value: Any) -> Any:
+        return [a + b for a, b in zip(current, value)]
+
+
+MetricType = TypeVar("MetricType", bound=Metric)
+
+
+class MetricsRegistry:
+    def __init__(self, directory: Path | None = None) -> None:
+        self.directory = directory
+        self._metrics: dict[str, Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        aggregate: Literal["sum", "latest"] = "sum",
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, aggregate))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric: MetricType) -> MetricType:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        # called before every snapshot, sets gauges that are read rather than tracked
+        self._collectors.append(collector)
+
+    def use_directory(self, directory: Path) -> None:
+        # every process writes its own file there, files left by a previous run are removed
+        directory.mkdir(parents=True, exist_ok=True)
+        for path in directory.glob(f"{_FILE_PREFIX}*.json"):
+            path.unlink()
+        self.directory = directory
+
+    def snapshot(self) -> dict:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception:
+                logger.exception("Metrics collector %s failed", collector)
+        return {name: metric.samples() for name, metric in self._metrics.items()}
+
+    def flush(self) -> None:
+        if self.directory is None:
+            return
+        path = self.directory / f"{_FILE_PREFIX}{os.getpid()}.json"
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.snapshot()))
+        # readers never see a half written file
+        os.replace(tmp_path, path)
+
+    async def run_flush(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Metrics flush failed")
+
+    def mark_process_dead(self, pid: int) -> None:
+        # counters and histograms of a finished worker still count, its gauges do not
+        if self.directory is None:
+            return
+        path = self.directory / f"{_FILE_PREFIX}{pid}.json"
+        if not path.exists():
+            return
+        snapshot = json.loads(path.read_text())
+        for name, metric in self._metrics.items():
+            if isinstance(metric, Gauge) and metric.aggregate == "sum":
+                snapshot.pop(name, None)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(snapshot))
+        os.replace(tmp_path, path)
+
+    def collect(self) -> dict[str, dict[tuple[str, ...], Any]]:
+        if self.directory is None:
+            snapshots = [self.snapshot()]
+        else:
+            self.flush()
+            snapshots = [json.loads(path.read_text()) for path in self.directory.glob(f"{_FILE_PREFIX}*.json")]
+
+        merged: dict[str, dict[tuple[str, ...], Any]] = {name: {} for name in self._metrics}
+        for snapshot in snapshots:
+            for name, samples in snapshot.items():
+                if name not in merged:
+                    continue
+                metric = self._metrics[name]
+                values = merged[name]
+                for key, value in samples:
+                    key = tuple(key)
+                    current = values.get(key)
+                    values[key] = value if current is None else metric.merge(current, value)
+        return merged
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for name, values in self.collect().items():
+            metric = self._metrics[name]
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for key, value in sorted(values.items()):
+                labels = list(zip(metric.labelnames, key))
+                if isinstance(metric, Histogram):
+                    cumulative = 0.0
+                    for bound, count in zip((*metric.buckets, math.inf), value):  # pyright: ignore
+                        cumulative += count
+                        le = "+Inf" if bound == math.inf else repr(float(bound))
+                        lines.append(f"{name}_bucket{_format_labels(labels + [('le', le)])} {_format_value(cumulative)}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value[-1])}")  # pyright: ignore
+                    lines.append(f"{name}_count{_format_labels(labels)} {_format_value(cumulative)}")
+                else:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(metric.value(value))}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: list[tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value.translate(_LABEL_ESCAPES)}"' for name, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value))
+
+
+def observe_pools(engines: Mapping[str, AsyncEngine]) -> None:
+    for name, engine in engines.items():
+        pool = engine.pool
+        checkedout = getattr(pool, "checkedout", None)
+        overflow = getattr(pool, "overflow", None)
+        if checkedout is not None:
+            DB_POOL_CHECKED_OUT.set(checkedout(), engine=name)
+        if overflow is not None:
+            # negative while the pool has not opened pool_size connections yet
+            DB_POOL_OVERFLOW.set(max(overflow(), 0), engine=name)
+
+
+metrics_registry = MetricsRegistry()
+
+HTTP_REQUESTS = metrics_registry.counter(
+    "http_requests_total",
+    "Handled HTTP requests",
+    ("method", "route", "status"),
+)
+HTTP_REQUEST_SECONDS = metrics_registry.histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending its response",
+    ("method", "route"),
+)
+TOKEN_OPERATION_SECONDS = metrics_registry.histogram(
+    "token_operation_duration_seconds",
+    "Password hashing, token signing and token decoding time",
+    ("operation",),
+)
+REPO_QUERY_SECONDS = metrics_registry.histogram(
+    "repo_query_duration_seconds",
+    "Repository method time, including waiting for a connection",
+    ("repo", "method"),
+)
+DB_POOL_CHECKED_OUT = metrics_registry.gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently taken from the pool",
+    ("engine",),
+)
+DB_POOL_OVERFLOW = metrics_registry.gauge(
+    "db_pool_overflow_connections",
+    "Connections opened beyond pool_size",
+    ("engine",),
+)
+CACHE_LOOKUPS = metrics_registry.counter(
+    "cache_lookups_total",
+    "In-process cache lookups by cache and result: hit or miss",
+    ("cache", "result"),
+)
+LOG_RECORDS_DROPPED = metrics_registry.counter(
+    "log_records_dropped_total",
+    "Log records dropped because the log queue was full",
+)
+TOKENS_PURGE_RUNS = metrics_registry.counter(
+    "tokens_purge_runs_total",
+    "Expired tokens purge runs by result: completed, skipped while another worker purged, or failed",
+    ("result",),
+)
+TOKENS_PURGED = metrics_registry.counter(
+    "tokens_purged_total",
+    "Expired tokens deleted by the purge",
+)
+TOKENS_PARTITIONS = metrics_registry.counter(
+    "tokens_partitions_total",
+    "Tokens partitions created and dropped by the purge",
+    ("action",),
+)
+TOKENS_PURGE_LAST_RUN_SECONDS = metrics_registry.gauge(
+    "tokens_purge_last_run_seconds",
+    "Duration of the latest completed purge run",
+    aggregate="latest",
+)
@@ -0,0 +1,41 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Iterator
+
+
+class ServerTimings:
+    def __init__(self) -> None:
+        self.durations: dict[str, float] = {}
+        self.running: set[str] = set()
+
+    def header_value(self) -> str:
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.durations.items())
+
+
+_timings: ContextVar[ServerTimings | None] = ContextVar("server_timings", default=None)
+
+
+def start(timings: ServerTimings) -> Token:
+    return _timings.set(timings)
+
+
+def stop(token: Token) -> None:
+    _timings.reset(token)
+
+
+@contextmanager
+def timing(name: str) -> Iterator[None]:
+    timings = _timings.get()
+    # outside a timed request, or nested in a phase of the same name that already counts this time
+    if timings is None or name in timings.running:
+        yield
+        return
+
+    timings.running.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.running.discard(name)
+        timings.durations[name] = timings.durations.get(name, 0.0) + time.perf_counter() - started
@@ -0,0 +1,238 @@
+import base64
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, ClassVar, Mapping, NamedTuple, Sequence
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric.ec import SECP256R1, EllipticCurvePrivateKey
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey
+from cryptography.hazmat.primitives.asymmetric.types import PrivateKeyTypes
+
+from src.config import settings
+from src.schemas.auth import TokenType
+from src.utils.keys import (
+    WatchedKey,
+    get_key_algorithm,
+    jwk_thumbprint,
+    load_private_key,
+    load_public_key,
+    to_public_jwk,
+)
+
+
+class VerificationKey(NamedTuple):
+    kid: str
+    algorithm: str
+    key: Any
+    jwk: dict | None
+
+
+class PublicKeyFile:
+    def __init__(self, path: Path, check_interval: float = 5.0) -> None:
+        self.path = path
+        self._public_key = WatchedKey(path, load_public_key, check_interval)
+        self._cached: tuple[int, VerificationKey] | None = None
+
+    def get_verification_key(self) -> VerificationKey:
+        public_key = self._public_key.get()
+        if self._cached is None or self._cached[0] != self._public_key.version:
+            algorithm = get_key_algorithm(public_key)
+            jwk = to_public_jwk(public_key)
+            kid = jwk_thumbprint(jwk)
+            verification_key = VerificationKey(
+                kid=kid,
+                algorithm=algorithm,
+                key=public_key,
+                jwk={**jwk, "kid": kid, "alg": algorithm, "use": "sig"},
+            )
+            self._cached = (self._public_key.version, verification_key)
+        return self._cached[1]
+
+
+class Signer(ABC):
+    algorithm: ClassVar[str]
+
+    @property
+    @abstractmethod
+    def kid(self) -> str: ...
+
+    @property
+    @abstractmethod
+    def signing_key(self) -> Any: ...
+
+    @abstractmethod
+    def get_verification_key(self) -> VerificationKey: ...
+
+    def sign(self, payload: dict) -> str:
+        return jwt.encode(
+            payload=payload,
+            key=self.signing_key,
+            algorithm=self.algorithm,
+            headers={"kid": self.kid},
+        )
+
+
+class AsymmetricSigner(Signer):
+    private_key_types: ClassVar[tuple[type, ...]]
+
+    def __init__(self, private_key_path: Path, public_key_path: Path, check_interval: float = 5.0) -> None:
+        self._private_key = WatchedKey(private_key_path, self._load_private_key, check_interval)
+        self._public_key = PublicKeyFile(public_key_path, check_interval)
+        self._kid: tuple[tuple[int, str], str] | None = None
+
+    def _load_private_key(self, data: bytes) -> PrivateKeyTypes:
+        key = load_private_key(data)
+        if not isinstance(key, self.private_key_types) or not self._is_supported(key):
+            raise TypeError(f"{type(key).__name__} cannot be used with {self.algorithm}")
+        return key
+
+    def _is_supported(self, key: PrivateKeyTypes) -> bool:
+        return True
+
+    @property
+    def kid(self) -> str:
+        private_key = self._private_key.get()
+        public_kid = self.get_verification_key().kid
+        checked = (self._private_key.version, public_kid)
+        if self._kid is None or self._kid[0] != checked:
+            kid = jwk_thumbprint(to_public_jwk(private_key.public_key()))  # pyright: ignore
+            # a mis-paired public key would publish and verify a kid no token is signed with;
+            # while a pair is being replaced, signing fails until both files are read again
+            if kid != public_kid:
+                raise ValueError(f"{self._private_key.path} does not match the public key {self._public_key.path}")
+            self._kid = (checked, kid)
+        return self._kid[1]
+
+    @property
+    def signing_key(self) -> PrivateKeyTypes:
+        return self._private_key.get()
+
+    def get_verification_key(self) -> VerificationKey:
+        return self._public_key.get_verification_key()
+
+
+class RS256Signer(AsymmetricSigner):
+    algorithm = "RS256"
+    private_key_types = (RSAPrivateKey,)
+
+
+class ES256Signer(AsymmetricSigner):
+    algorithm = "ES256"
+    private_key_types = (EllipticCurvePrivateKey,)
+
+    def _is_supported(self, key: PrivateKeyTypes) -> bool:
+        return isinstance(key.curve, SECP256R1)  # pyright: ignore
+
+
+class EdDSASigner(AsymmetricSigner):
+    algorithm = "EdDSA"
+    private_key_types = (Ed25519PrivateKey,)
+
+
+class HS256Signer(Signer):
+    algorithm = "HS256"
+
+    def __init__(self, secret: str) -> None:
+        self._secret = secret.encode("utf-8")
+        encoded_secret = base64.urlsafe_b64encode(self._secret).rstrip(b"=").decode()
+        self._kid = jwk_thumbprint({"kty": "oct", "k": encoded_secret})
+
+    @property
+    def kid(self) -> str:
+        return self._kid
+
+    @property
+    def signing_key(self) -> bytes:
+        return self._secret
+
+    def get_verification_key(self) -> VerificationKey:
+        # shared secrets are never published in JWKS
+        return VerificationKey(kid=self._kid, algorithm=self.algorithm, key=self._secret, jwk=None)
+
+
+class JWTKeyStore:
+    def __init__(
+        self,
+        signers: Mapping[TokenType, Signer],
+        default_signer: Signer,
+        additional_public_keys: Sequence[PublicKeyFile] = (),
+    ) -> None:
+        self._signers = dict(signers)
+        self._default_signer = default_signer
+        self._additional_public_keys = list(additional_public_keys)
+        self._indexed_kids: tuple[str, ...] | None = None
+        self._keys_by_kid: dict[str, VerificationKey] = {}
+        self._jwks: tuple[bytes, str] = (b"", "")
+
+    def signer_for(self, token_type: TokenType) -> Signer:
+        return self._signers.get(token_type, self._default_signer)
+
+    def check(self) -> None:
+        # reading the kid loads a signer's keys and fails on a private key that does not match its public key
+        for signer in (self._default_signer, *self._signers.values()):
+            _ = signer.kid
+
+    def get_verification_key(self, kid: object) -> VerificationKey | None:
+        if kid is None:
+            # tokens issued before kid headers were introduced
+            return self._default_signer.get_verification_key()
+        if not isinstance(kid, str):
+            return None
+        self._refresh_index()
+        return self._keys_by_kid.get(kid)
+
+    def get_jwks(self) -> tuple[bytes, str]:
+        self._refresh_index()
+        return self._jwks
+
+    def _refresh_index(self) -> None:
+        signers = {id(signer): signer for signer in (self._default_signer, *self._signers.values())}
+        keys = [signer.get_verification_key() for signer in signers.values()]
+        keys += [public_key.get_verification_key() for public_key in self._additional_public_keys]
+        kids = tuple(key.kid for key in keys)
+        if kids == self._indexed_kids:
+            return
+
+        keys_by_kid: dict[str, VerificationKey] = {}
+        for key in keys:
+            keys_by_kid.setdefault(key.kid, key)
+        jwks = [key.jwk for key in keys_by_kid.values() if key.jwk is not None]
+        content = json.dumps({"keys": jwks}, separators=(",", ":")).encode()
+        self._keys_by_kid = keys_by_kid
+        self._jwks = (content, f'"{hashlib.sha256(content).hexdigest()}"')
+        self._indexed_kids = kids
+
+
+def create_signer(algorithm: str) -> Signer:
+    auth = settings.auth
+    if algorithm == "RS256":
+        return RS256Signer(auth.JWT_PRIVATE_KEY, auth.JWT_PUBLIC_KEY, auth.JWT_KEYS_CHECK_INTERVAL)
+    if algorithm == "ES256":
+        return ES256Signer(auth.JWT_ES256_PRIVATE_KEY, auth.JWT_ES256_PUBLIC_KEY, auth.JWT_KEYS_CHECK_INTERVAL)
+    if algorithm == "EdDSA":
+        return EdDSASigner(auth.JWT_EDDSA_PRIVATE_KEY, auth.JWT_EDDSA_PUBLIC_KEY, auth.JWT_KEYS_CHECK_INTERVAL)
+    if algorithm == "HS256":
+        if auth.JWT_HS256_SECRET is None:
+            raise ValueError("JWT_HS256_SECRET must be set to sign tokens with HS256")
+        return HS256Signer(auth.JWT_HS256_SECRET.get_secret_value())
+    raise ValueError(f"Unsupported JWT algorithm: {algorithm}")
+
+
+def create_key_store() -> JWTKeyStore:
+    auth = settings.auth
+    algorithms = {
+        TokenType.ACCESS: auth.JWT_ACCESS_ALGORITHM or auth.JWT_ALGORITHM,
+        TokenType.REFRESH: auth.JWT_REFRESH_ALGORITHM or auth.JWT_ALGORITHM,
+    }
+    signers = {algorithm: create_signer(algorithm) for algorithm in {auth.JWT_ALGORITHM, *algorithms.values()}}
+    return JWTKeyStore(
+        signers={token_type: signers[algorithm] for token_type, algorithm in algorithms.items()},
+        default_signer=signers[auth.JWT_ALGORITHM],
+        additional_public_keys=[PublicKeyFile(path, auth.JWT_KEYS_CHECK_INTERVAL) for path in auth.JWT_ADDITIONAL_PUBLIC_KEYS],
+    )
+
+
+key_store = create_key_store()
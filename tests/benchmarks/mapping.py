@@ -0,0 +1,64 @@
+"""
+get_all_filtered over a large result set with trusted and validating mappers.
+
+Rows are inserted into the configured database inside a transaction that is
+rolled back at the end.
+
+    python -m tests.benchmarks.mapping --rows 50000 --rounds 5
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import insert
+
+from src.db import sessionmaker_null_pool
+from src.models.auth import User
+from src.repos.auth import AuthRepo
+from src.repos.mappers.mappers import AuthMapper
+
+
+class ValidatingAuthMapper(AuthMapper):
+    trusted = False
+
+
+class ValidatingAuthRepo(AuthRepo):
+    mapper = ValidatingAuthMapper
+
+
+async def measure(repo: AuthRepo, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await repo.get_all_filtered(User.username.like("bench%"))
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50000, help="number of users to read")
+    parser.add_argument("--rounds", type=int, default=5, help="best of this many reads is reported")
+    args = parser.parse_args()
+
+    async with sessionmaker_null_pool() as session:
+        users = [
+            {"username": f"bench{i:08d}", "first_name": "Ivan", "last_name": "Ivanov", "hashed_password": "x"}
+            for i in range(args.rows)
+        ]
+        for offset in range(0, len(users), 5000):
+            await session.execute(insert(User), users[offset : offset + 5000])
+
+        validated = await measure(ValidatingAuthRepo(session), args.rounds)
+        trusted = await measure(AuthRepo(session), args.rounds)
+        await session.rollback()
+
+    print(f"{'mapper':>10} {'seconds':>10} {'rows/s':>12}")
+    print(f"{'validated':>10} {validated:>10.3f} {args.rows / validated:>12.0f}")
+    print(f"{'trusted':>10} {trusted:>10.3f} {args.rows / trusted:>12.0f}")
+    print(f"speedup: {validated / trusted:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+"""
+Refresh token rotation and lookup latency on a large tokens table.
+
+Fills the test database with --rows users and one refresh token each,
+measures TokenRepo.rotate (POST /auth/refresh/) and the stored token lookup
+of the logout dependency, then removes the generated rows.
+
+    python -m tests.benchmarks.refresh --rows 10000000 --samples 2000
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from src.config import settings
+from src.db import engine_null_pool, sessionmaker_null_pool
+from src.schemas.auth import RefreshClaimsDTO, TokenAddDTO, TokenType
+from src.utils.db_tools import DBManager
+
+USERNAME_PREFIX = "bench_refresh_"
+# every generated token expires at once, rotations keep the expiry so a user can be sampled twice
+EXPIRES_AT = datetime.now().replace(microsecond=0) + timedelta(days=30)
+
+
+async def fill(rows: int) -> tuple[int, int]:
+    async with engine_null_pool.begin() as conn:
+        first_id = (await conn.execute(text("SELECT coalesce(max(id), 0) + 1 FROM users"))).scalar_one()
+        await conn.execute(
+            text(
+                "INSERT INTO users (id, username, hashed_password) "
+                "SELECT g, CAST(:prefix AS text) || g, 'x' "
+                "FROM generate_series(CAST(:first_id AS integer), CAST(:last_id AS integer)) AS g"
+            ),
+            {"prefix": USERNAME_PREFIX, "first_id": first_id, "last_id": first_id + rows - 1},
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO tokens (user_id, type, hashed_data, expires_at) "
+                "SELECT g, 'REFRESH', md5(g::text), CAST(:expires_at AS timestamp) "
+                "FROM generate_series(CAST(:first_id AS integer), CAST(:last_id AS integer)) AS g"
+            ),
+            {"first_id": first_id, "last_id": first_id + rows - 1, "expires_at": EXPIRES_AT},
+        )
+        await conn.execute(
+            text("SELECT setval(pg_get_serial_sequence('users', 'id'), :last_id)"), {"last_id": first_id + rows - 1}
+        )
+    async with engine_null_pool.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE users, tokens"))
+    return first_id, first_id + rows - 1
+
+
+async def cleanup(first_id: int, last_id: int) -> None:
+    async with engine_null_pool.begin() as conn:
+        params = {"first_id": first_id, "last_id": last_id}
+        await conn.execute(text("DELETE FROM tokens WHERE user_id BETWEEN :first_id AND :last_id"), params)
+        await conn.execute(text("DELETE FROM users WHERE id BETWEEN :first_id AND :last_id"), params)
+
+
+async def explain_rotate(user_id: int) -> str:
+    async with engine_null_pool.connect() as conn:
+        plan = await conn.execute(
+            text(
+                "EXPLAIN (ANALYZE, COSTS OFF) UPDATE tokens SET hashed_data = md5(random()::text) "
+                "WHERE user_id = :user_id AND type = 'REFRESH' AND hashed_data = md5(CAST(:user_id AS integer)::text) "
+                "AND expires_at >= CAST(:expires_at AS timestamp) "
+                "AND expires_at < CAST(:expires_at AS timestamp) + interval '1 second' "
+                "RETURNING id"
+            ),
+            {"user_id": user_id, "expires_at": EXPIRES_AT},
+        )
+        await conn.rollback()
+        return "\n".join(row[0] for row in plan)
+
+
+async def measure_rotate(user_ids: list[int]) -> list[float]:
+    timings = []
+    # the hashes fill() stored, a rotation presents the token it replaced last
+    stored = {user_id: hashlib.md5(str(user_id).encode()).hexdigest() for user_id in user_ids}
+    async with DBManager(session_factory=sessionmaker_null_pool) as db:
+        for user_id in user_ids:
+            token = TokenAddDTO(
+                user_id=user_id,
+                type=TokenType.REFRESH,
+                hashed_data=f"{user_id}-{random.random()}",
+                expires_at=EXPIRES_AT,
+            )
+            presented = RefreshClaimsDTO(user_id=user_id, hashed_data=stored[user_id], expires_at=EXPIRES_AT)
+            started = time.perf_counter()
+            await db.tokens.rotate(token, presented=presented)
+            await db.commit()
+            timings.append(time.perf_counter() - started)
+            stored[user_id] = token.hashed_data
+    return timings
+
+
+async def measure_lookup(user_ids: list[int]) -> list[float]:
+    timings = []
+    async with DBManager(session_factory=sessionmaker_null_pool) as db:
+        for user_id in user_ids:
+            started = time.perf_counter()
+            await db.tokens.get_one(user_id=user_id, type=TokenType.REFRESH)
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+def report(name: str, timings: list[float]) -> None:
+    quantiles = statistics.quantiles(timings, n=100)
+    print(f"{name:>8} p50={quantiles[49] * 1000:.2f}ms p95={quantiles[94] * 1000:.2f}ms p99={quantiles[98] * 1000:.2f}ms")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="users and refresh tokens to generate")
+    parser.add_argument("--samples", type=int, default=2000, help="operations to time")
+    args = parser.parse_args()
+    if settings.app.MODE != "TEST":
+        raise SystemExit("Run the benchmark against the test database (CFG_APP__MODE=TEST)")
+
+    started = time.perf_counter()
+    first_id, last_id = await fill(args.rows)
+    print(f"generated {args.rows} tokens in {time.perf_counter() - started:.0f}s")
+    try:
+        user_ids = [random.randint(first_id, last_id) for _ in range(args.samples)]
+        print(await explain_rotate(user_ids[0]))
+        report("rotate", await measure_rotate(user_ids))
+        report("lookup", await measure_lookup(user_ids))
+    finally:
+        await cleanup(first_id, last_id)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+"""
+Sign and verify throughput of every supported JWT algorithm.
+
+    python -m tests.benchmarks.signers --seconds 2
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from cryptography.hazmat.primitives.serialization import Encoding, NoEncryption, PrivateFormat, PublicFormat
+
+from src.utils.signers import EdDSASigner, ES256Signer, HS256Signer, RS256Signer, Signer
+
+PAYLOAD = {"sub": "1", "username": "admin123456", "type": "access", "iat": 1700000000, "exp": 4102444800}
+
+
+def generate_key_files(private_key, directory: Path, name: str) -> tuple[Path, Path]:
+    private_path = directory / f"{name}-private.pem"
+    public_path = directory / f"{name}-public.pem"
+    private_path.write_bytes(private_key.private_bytes(Encoding.PEM, PrivateFormat.PKCS8, NoEncryption()))
+    public_path.write_bytes(private_key.public_key().public_bytes(Encoding.PEM, PublicFormat.SubjectPublicKeyInfo))
+    return private_path, public_path
+
+
+def create_signers(directory: Path) -> list[Signer]:
+    return [
+        RS256Signer(*generate_key_files(rsa.generate_private_key(65537, 2048), directory, "rs256")),
+        ES256Signer(*generate_key_files(ec.generate_private_key(ec.SECP256R1()), directory, "es256")),
+        EdDSASigner(*generate_key_files(ed25519.Ed25519PrivateKey.generate(), directory, "eddsa")),
+        HS256Signer("benchmark-secret-" + "x" * 32),
+    ]
+
+
+def measure(func: Callable[[], object], seconds: float) -> float:
+    operations = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(50):
+            func()
+        operations += 50
+    return operations / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=1.0, help="duration of every measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        signers = create_signers(Path(directory))
+        print(f"{'algorithm':>10} {'sign ops/s':>12} {'verify ops/s':>14}")
+        for signer in signers:
+            token = signer.sign(PAYLOAD)
+            key = signer.get_verification_key()
+            sign_rate = measure(lambda: signer.sign(PAYLOAD), args.seconds)
+            verify_rate = measure(lambda: jwt.decode(token, key=key.key, algorithms=[key.algorithm]), args.seconds)
+            print(f"{signer.algorithm:>10} {sign_rate:>12.0f} {verify_rate:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
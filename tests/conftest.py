@@ -5,7 +5,14 @@ from typing import Any, AsyncGenerator
 import pytest
 from httpx import ASGITransport, AsyncClient
 
-from src.api.v1.dependencies.db import get_db, get_db_with_null_pool
+from src.api.v1.dependencies.db import (
+    get_db,
+    get_db_with_null_pool,
+    get_read_db,
+    get_read_db_factory,
+    get_read_db_factory_with_null_pool,
+    get_read_db_with_null_pool,
+)
 from src.config import settings
 from src.db import engine_null_pool
 from src.main import app
@@ -14,6 +21,8 @@ from src.models.base import Base
 from src.utils.db_tools import DBHealthChecker, DBManager
 
 app.dependency_overrides[get_db] = get_db_with_null_pool
+app.dependency_overrides[get_read_db] = get_read_db_with_null_pool
+app.dependency_overrides[get_read_db_factory] = get_read_db_factory_with_null_pool
 
 
 @pytest.fixture
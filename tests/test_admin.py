@@ -0,0 +1,58 @@
+import json
+from unittest.mock import patch
+
+from httpx import AsyncClient
+
+from src.api.v1.dependencies.db import get_read_db_factory_with_null_pool
+from src.db import engine_read_null_pool
+from src.models.auth import User
+from src.schemas.auth import UserAddDTO
+from src.services.auth import AuthService, TokenService
+from src.utils.db_tools import DBManager
+from src.utils.exceptions import AdminRequiredHTTPError
+
+
+async def test_export_users(ac: AsyncClient, db: DBManager):
+    ids = await db.auth.copy_bulk(
+        [UserAddDTO(username=f"exported_user_{i:04d}", hashed_password="hash") for i in range(2500)],
+        return_ids=True,
+    )
+    await db.commit()
+    assert ids
+    headers = {"Authorization": f"Bearer {TokenService().create_access_token({'sub': str(ids[0])}).token}"}
+
+    response = await ac.get("/admin/users/export/", headers=headers)
+    assert response.status_code == AdminRequiredHTTPError.status
+    assert response.json()["detail"] == AdminRequiredHTTPError.detail
+
+    with patch("src.config.settings.auth.ADMIN_USER_IDS", [ids[0]]):
+        response = await ac.get("/admin/users/export/", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    users = [json.loads(line) for line in response.text.splitlines()]
+    exported = [user for user in users if user["username"].startswith("exported_user_")]
+    assert [user["id"] for user in exported] == ids
+    assert set(exported[0]) == {"id", "username", "first_name", "last_name"}
+
+    await db.auth.delete(True, User.id.in_(ids))
+    await db.commit()
+
+
+async def test_export_holds_no_transaction_between_pages(db: DBManager):
+    ids = await db.auth.copy_bulk(
+        [UserAddDTO(username=f"paged_user_{i}", hashed_password="hash") for i in range(3)],
+        return_ids=True,
+    )
+    await db.commit()
+
+    async with get_read_db_factory_with_null_pool()() as read_db:
+        assert read_db.session.bind is engine_read_null_pool
+        exported = []
+        async for users in AuthService(read_db).iter_users(batch_size=2):
+            assert not read_db.session.in_transaction()
+            exported += [user.id for user in users]
+    assert set(ids) <= set(exported)
+    assert exported == sorted(exported)
+
+    await db.auth.delete(True, User.id.in_(ids))
+    await db.commit()
@@ -0,0 +1,65 @@
+from src.api.v1.dependencies.auth import _decode_token
+from src.services.auth import TokenService
+from src.utils.cache import TTLCache
+from src.utils.metrics import metrics_registry
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def test_ttl_cache_hits_and_misses():
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, clock=_Clock())
+    assert cache.get("a") is None
+    cache.set("a", 1, expires_at=2000)
+    assert cache.get("a") == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+async def test_ttl_cache_lookups_are_exported():
+    def lookups() -> dict:
+        return metrics_registry.collect()["cache_lookups_total"]
+
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, clock=_Clock(), name="test_exported")
+    cache.set("a", 1, expires_at=2000)
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+    assert lookups()[("test_exported", "hit")] == 2
+    assert lookups()[("test_exported", "miss")] == 1
+
+
+async def test_ttl_cache_expires_items():
+    clock = _Clock()
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, clock=clock)
+    cache.set("a", 1, expires_at=1010)
+    cache.set("b", 2, expires_at=900)
+    assert len(cache) == 1
+
+    clock.now = 1010
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+async def test_ttl_cache_evicts_least_recently_used():
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, clock=_Clock())
+    cache.set("a", 1, expires_at=2000)
+    cache.set("b", 2, expires_at=2000)
+    cache.get("a")
+    cache.set("c", 3, expires_at=2000)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+async def test_decode_token_uses_cache():
+    cache: TTLCache[bytes, dict] = TTLCache(maxsize=10)
+    token = TokenService().create_access_token({"sub": "1"}).token
+    first = _decode_token(token, cache=cache)
+    second = _decode_token(token, cache=cache)
+    assert second is first
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,37 @@
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.config import settings
+from src.db import get_connect_args, get_pool_options
+from src.utils.db_tools import DBWarmer
+
+
+async def test_connect_args():
+    config = settings.db.model_copy(update={"DB_STATEMENT_TIMEOUT": 1500, "DB_APPLICATION_NAME": "jwt_app"})
+    connect_args = get_connect_args(config)
+    assert connect_args["statement_cache_size"] == config.DB_STATEMENT_CACHE_SIZE
+    assert connect_args["server_settings"] == {"statement_timeout": "1500", "application_name": "jwt_app"}
+    assert "prepared_statement_name_func" not in connect_args
+
+
+async def test_connect_args_for_pgbouncer():
+    connect_args = get_connect_args(settings.db.model_copy(update={"DB_PGBOUNCER": True}))
+    assert connect_args["statement_cache_size"] == 0
+    assert connect_args["prepared_statement_cache_size"] == 0
+    name_func = connect_args["prepared_statement_name_func"]
+    assert name_func() != name_func()
+
+
+async def test_pool_options():
+    options = get_pool_options(settings.db.model_copy(update={"DB_POOL_SIZE": 20, "DB_MAX_OVERFLOW": 0}))
+    assert options["pool_size"] == 20
+    assert options["max_overflow"] == 0
+
+
+async def test_warm_up_stays_within_pool_capacity():
+    engine = create_async_engine(settings.db.DB_URL, pool_size=1, max_overflow=1, pool_timeout=1)
+    try:
+        # five at once would wait for pool_timeout and raise
+        await DBWarmer(engine=engine).warm_up(connections=5)
+        assert engine.pool.checkedin() == 1  # pyright: ignore
+    finally:
+        await engine.dispose()
@@ -1,4 +1,10 @@
+import asyncio
+
+import pytest
+
 from src.services.auth import TokenService
+from src.utils.exceptions import PasswordHashingOverloadedError, PasswordHashingTimeoutError
+from src.utils.hashing import PasswordHasher
 
 
 async def test_password_hashing():
@@ -17,3 +23,34 @@ async def test_token_hashing():
     assert hashed_token != token
     is_same = TokenService().verify_token(token, hashed_token)
     assert is_same
+
+
+async def test_password_hashing_in_pool():
+    password = "test_password"
+    hasher = PasswordHasher(max_workers=2)
+    hashed_password = await hasher.hash(password)
+    assert hashed_password != password
+    assert await hasher.verify(password, hashed_password)
+    assert not await hasher.verify("wrong_password", hashed_password)
+    assert TokenService().verify_pwd(password, hashed_password)
+    assert hasher.pending == 0
+    hasher.shutdown()
+
+
+async def test_password_hashing_queue_limit():
+    hasher = PasswordHasher(max_workers=1, max_pending=1)
+    results = await asyncio.gather(
+        hasher.hash("test_password"),
+        hasher.hash("test_password"),
+        return_exceptions=True,
+    )
+    assert isinstance(results[0], str)
+    assert isinstance(results[1], PasswordHashingOverloadedError)
+    hasher.shutdown()
+
+
+async def test_password_hashing_timeout():
+    hasher = PasswordHasher(max_workers=1, timeout=0.001)
+    with pytest.raises(PasswordHashingTimeoutError):
+        await hasher.hash("test_password")
+    hasher.shutdown()
@@ -0,0 +1,26 @@
+from httpx import AsyncClient
+
+from src.config import settings
+from src.db import engine
+from src.main import app
+from src.utils.exceptions import ServiceNotReadyHTTPError
+
+HEALTH_URL = f"http://{settings.uvicorn.UVICORN_HOST}:{settings.uvicorn.UVICORN_PORT}/health"
+
+
+async def test_ready_after_warm_up(ac: AsyncClient):
+    response = await ac.get(f"{HEALTH_URL}/live/")
+    assert response.status_code == 200
+
+    response = await ac.get(f"{HEALTH_URL}/ready/")
+    assert response.status_code == ServiceNotReadyHTTPError.status
+
+    async with app.router.lifespan_context(app):
+        assert engine.pool.checkedin() == settings.db.DB_POOL_SIZE  # pyright: ignore
+        response = await ac.get(f"{HEALTH_URL}/ready/")
+        assert response.status_code == 200
+        assert response.json() == {"status": "ready"}
+
+    response = await ac.get(f"{HEALTH_URL}/ready/")
+    assert response.status_code == ServiceNotReadyHTTPError.status
+    assert engine.pool.checkedin() == 0  # pyright: ignore
@@ -0,0 +1,58 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from src.models.auth import User
+from src.repos.auth import AuthRepo
+from src.services.auth import TokenService
+from src.tools.import_users import import_users
+from src.utils.db_tools import DBManager
+
+
+async def test_import_users(tmp_path: Path, db: DBManager):
+    records = [
+        {"username": "imported_user_1", "password": "password1"},
+        {"username": "short", "password": "password2"},
+        {"username": "imported_user_2", "password": "password3"},
+        {"username": "imported_user_3", "password": "password4"},
+    ]
+    path = tmp_path / "users.ndjson"
+    path.write_text("\n".join(json.dumps(record) for record in records))
+
+    stats = await import_users(path, "ndjson", workers=2, batch_size=2)
+    assert (stats.read, stats.invalid, stats.imported) == (4, 1, 3)
+
+    users = await db.auth.get_all_filtered(User.username.like("imported_user_%"))
+    assert [user.username for user in users] == ["imported_user_1", "imported_user_2", "imported_user_3"]
+    user = await db.auth.get_user_with_passwd(username="imported_user_2")
+    assert TokenService().verify_pwd("password3", user.hashed_password)
+
+    await db.auth.delete(True, User.username.like("imported_user_%"))
+    await db.commit()
+
+
+async def test_import_users_from_csv(tmp_path: Path, db: DBManager):
+    path = tmp_path / "users.csv"
+    path.write_text("username,password\nimported_csv_user,password1\n")
+
+    stats = await import_users(path, "csv", workers=1, batch_size=100)
+    assert stats.imported == 1
+    assert await db.auth.get_one_or_none(username="imported_csv_user")
+
+    await db.auth.delete(username="imported_csv_user")
+    await db.commit()
+
+
+async def test_failed_import_stops_prefetched_hashing(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    async def failing_copy_bulk(*args, **kwargs):
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(AuthRepo, "copy_bulk", failing_copy_bulk)
+    path = tmp_path / "users.ndjson"
+    path.write_text("\n".join(json.dumps({"username": f"failed_user_{i}", "password": "password"}) for i in range(4)))
+
+    with pytest.raises(RuntimeError):
+        await import_users(path, "ndjson", workers=1, batch_size=2)
+    assert not [task for task in asyncio.all_tasks() if task.get_coro().__name__ == "hash_batch"]  # pyright: ignore
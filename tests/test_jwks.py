@@ -0,0 +1,51 @@
+import jwt
+import pytest
+from httpx import AsyncClient
+
+from src.config import settings
+from src.schemas.auth import TokenType
+from src.services.auth import TokenService
+from src.utils.exceptions import CannotDecodeTokenError
+from src.utils.signers import key_store
+
+JWKS_URL = f"http://{settings.uvicorn.UVICORN_HOST}:{settings.uvicorn.UVICORN_PORT}/.well-known/jwks.json"
+
+
+async def test_get_jwks(ac: AsyncClient):
+    response = await ac.get(JWKS_URL)
+    assert response.status_code == 200
+    assert response.headers["etag"]
+    assert f"max-age={settings.auth.JWKS_MAX_AGE}" in response.headers["cache-control"]
+
+    keys = response.json()["keys"]
+    assert keys
+    token = TokenService().create_access_token({"sub": "1"}).token
+    kid = jwt.get_unverified_header(token)["kid"]
+    assert kid in {key["kid"] for key in keys}
+
+    public_key = jwt.PyJWK(next(key for key in keys if key["kid"] == kid)).key
+    payload = jwt.decode(token, key=public_key, algorithms=[settings.auth.JWT_ALGORITHM])
+    assert payload["sub"] == "1"
+
+
+async def test_get_jwks_not_modified(ac: AsyncClient):
+    response = await ac.get(JWKS_URL)
+    etag = response.headers["etag"]
+
+    response = await ac.get(JWKS_URL, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert not response.content
+
+
+async def test_decode_token_with_unknown_kid():
+    signer = key_store.signer_for(TokenType.ACCESS)
+    token = jwt.encode({"sub": "1"}, key=signer.signing_key, algorithm=signer.algorithm, headers={"kid": "unknown"})
+    with pytest.raises(CannotDecodeTokenError):
+        TokenService().decode_token(token)
+
+
+async def test_decode_token_without_kid():
+    signer = key_store.signer_for(TokenType.ACCESS)
+    token = jwt.encode({"sub": "1"}, key=signer.signing_key, algorithm=signer.algorithm)
+    assert TokenService().decode_token(token)["sub"] == "1"
@@ -0,0 +1,55 @@
+import os
+from pathlib import Path
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.serialization import Encoding, NoEncryption, PrivateFormat
+
+from src.utils.keys import WatchedKey, load_private_key
+
+
+def _write_private_key(path: Path) -> None:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    path.write_bytes(key.private_bytes(Encoding.PEM, PrivateFormat.PKCS8, NoEncryption()))
+
+
+async def test_watched_key_is_parsed_once(tmp_path: Path):
+    path = tmp_path / "jwt-private.pem"
+    _write_private_key(path)
+    loads = []
+
+    def loader(data: bytes):
+        loads.append(data)
+        return load_private_key(data)
+
+    watched = WatchedKey(path, loader, check_interval=0)
+    first = watched.get()
+    assert watched.get() is first
+    assert len(loads) == 1
+
+
+async def test_watched_key_reloads_replaced_file(tmp_path: Path):
+    path = tmp_path / "jwt-private.pem"
+    _write_private_key(path)
+    watched = WatchedKey(path, load_private_key, check_interval=0)
+    first = watched.get()
+
+    new_path = tmp_path / "jwt-private.pem.new"
+    _write_private_key(new_path)
+    os.replace(new_path, path)
+
+    second = watched.get()
+    assert second is not first
+    assert second.private_numbers() != first.private_numbers()  # pyright: ignore
+
+
+async def test_watched_key_respects_check_interval(tmp_path: Path):
+    path = tmp_path / "jwt-private.pem"
+    _write_private_key(path)
+    watched = WatchedKey(path, load_private_key, check_interval=3600)
+    first = watched.get()
+
+    new_path = tmp_path / "jwt-private.pem.new"
+    _write_private_key(new_path)
+    os.replace(new_path, path)
+
+    assert watched.get() is first
@@ -0,0 +1,145 @@
+import io
+import json
+import logging
+from logging.handlers import BufferingHandler
+
+from httpx import AsyncClient
+
+from src.api.middlewares import RequestLogMiddleware
+from src.config import settings
+from src.services.auth import TokenService
+from src.utils.logging import BoundedQueueHandler, JSONFormatter, LogQueue
+from src.utils.metrics import metrics_registry
+
+
+def test_full_queue_drops_records():
+    handler = BoundedQueueHandler(maxsize=2)
+    logger = logging.getLogger("test_logging.drops")
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    for i in range(5):
+        logger.warning("record %d", i)
+    assert handler.queue.qsize() == 2  # pyright: ignore
+    assert handler.dropped == 3
+
+
+def _dropped_on_metrics_page() -> float:
+    line = next(line for line in metrics_registry.render().splitlines() if line.startswith("log_records_dropped_total "))
+    return float(line.split()[-1])
+
+
+def test_dropped_records_are_exported():
+    handler = BoundedQueueHandler(maxsize=1)
+    logger = logging.getLogger("test_logging.exported_drops")
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    dropped_before = _dropped_on_metrics_page()
+    for i in range(3):
+        logger.warning("record %d", i)
+    assert _dropped_on_metrics_page() == dropped_before + 2
+
+
+def test_log_queue_writes_through_configured_handlers():
+    memory = BufferingHandler(capacity=100)
+    memory.name = "memory"
+    other = logging.NullHandler()
+    logger = logging.getLogger("test_logging.pipeline")
+    logger.propagate = False
+    logger.handlers = [memory, other]
+
+    log_queue = LogQueue(maxsize=100)
+    log_queue.install({"handlers": {"memory": {}}, "loggers": {"test_logging.pipeline": {}}})
+    assert logger.handlers == [other, log_queue.handler]
+
+    logger.info("queued %s", "message")
+    log_queue.uninstall()
+    assert [record.getMessage() for record in memory.buffer] == ["queued message"]
+    assert logger.handlers == [other, memory]
+    assert log_queue.dropped == 0
+
+
+def test_caller_lookup_is_restored_on_uninstall():
+    memory = BufferingHandler(capacity=100)
+    memory.name = "memory"
+    logger = logging.getLogger("test_logging.caller")
+    logger.propagate = False
+    logger.handlers = [memory]
+
+    log_queue = LogQueue(maxsize=100)
+    log_queue.install({"handlers": {"memory": {}}, "loggers": {"test_logging.caller": {}}}, caller_info=False)
+    logger.info("without caller")
+    log_queue.uninstall()
+    logger.info("with caller")
+
+    without_caller, with_caller = memory.buffer
+    assert without_caller.funcName == "(unknown function)"
+    assert with_caller.funcName == "test_caller_lookup_is_restored_on_uninstall"
+
+
+def test_queued_exception_keeps_exc_info():
+    stream = io.StringIO()
+    json_handler = logging.StreamHandler(stream)
+    json_handler.name = "json_stream"
+    json_handler.setFormatter(JSONFormatter())
+    logger = logging.getLogger("test_logging.exceptions")
+    logger.propagate = False
+    logger.handlers = [json_handler]
+
+    log_queue = LogQueue(maxsize=100)
+    log_queue.install({"handlers": {"json_stream": {}}, "loggers": {"test_logging.exceptions": {}}})
+    try:
+        raise ValueError("broken")
+    except ValueError:
+        logger.exception("failed %s", "request")
+    log_queue.uninstall()
+
+    entry = json.loads(stream.getvalue())
+    assert entry["message"] == "failed request"
+    assert "ValueError: broken" in entry["exc_info"]
+
+
+def test_json_formatter():
+    record = logging.LogRecord("src.access", logging.INFO, __file__, 1, "request %s", ("done",), None)
+    record.fields = {"status": 200, "user_id": 7}
+    entry = json.loads(JSONFormatter().format(record))
+    assert entry["message"] == "request done"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "src.access"
+    assert entry["status"] == 200
+    assert entry["user_id"] == 7
+
+
+async def test_request_log_has_user_and_latency(ac: AsyncClient):
+    memory = BufferingHandler(capacity=100)
+    logger = logging.getLogger("src.access")
+    logger.addHandler(memory)
+    access_token = TokenService().create_access_token(payload={"username": "nobody", "sub": "424242"})
+    try:
+        await ac.get("/auth/profile/", headers={"Authorization": f"Bearer {access_token.token}"})
+        await ac.get(f"http://{settings.uvicorn.UVICORN_HOST}:{settings.uvicorn.UVICORN_PORT}/health/live/")
+    finally:
+        logger.removeHandler(memory)
+
+    profile, live = [record.fields for record in memory.buffer]  # pyright: ignore
+    assert profile["path"] == "/api/v1/auth/profile/"
+    assert profile["status"] == 404
+    assert profile["user_id"] == 424242
+    assert profile["latency_ms"] >= 0
+    assert live["status"] == 200
+    assert live["user_id"] is None
+
+
+def test_request_log_samples_successful_requests():
+    middleware = RequestLogMiddleware(app=None, sample_rate=0.0)  # pyright: ignore
+    memory = BufferingHandler(capacity=100)
+    logger = logging.getLogger("src.access")
+    logger.addHandler(memory)
+    scope = {"method": "GET", "path": "/", "client": ("127.0.0.1", 1)}
+    try:
+        middleware._log(scope, 200, 0.01)
+        middleware._log(scope, 500, 0.01)
+    finally:
+        logger.removeHandler(memory)
+    assert [record.fields["status"] for record in memory.buffer] == [500]  # pyright: ignore
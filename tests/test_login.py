@@ -1,6 +1,10 @@
+import asyncio
+
 import pytest
 from httpx import AsyncClient
 
+from src.config import settings
+from src.services.auth import TokenService
 from src.utils.db_tools import DBManager
 
 
@@ -71,3 +75,45 @@ async def test_check_login_return_body(
     assert data.get("access_token", False)
     assert data.get("refresh_token", False)
     assert data.get("type", "") == "Bearer"
+
+
+async def test_login_keeps_single_refresh_token(
+    ac: AsyncClient,
+    db: DBManager,
+    register_user: tuple[str, str],
+) -> None:
+    for _ in range(2):
+        response = await ac.post(
+            "/auth/login/",
+            json={"username": register_user[0], "password": register_user[1]},
+        )
+        assert response.status_code == 200
+
+    user = await db.auth.get_one(username=register_user[0])
+    tokens = await db.tokens.get_all_filtered(user_id=user.id)
+    assert len(tokens) == 1
+    assert TokenService().verify_token(response.json()["refresh_token"], tokens[0].hashed_data)
+
+
+async def test_concurrent_login_refresh_and_logout(
+    ac: AsyncClient,
+    db: DBManager,
+    register_user: tuple[str, str],
+) -> None:
+    credentials = {"username": register_user[0], "password": register_user[1]}
+    response = await ac.post("/auth/login/", json=credentials)
+    headers = {"Cookie": f"{settings.auth.REFRESH_TOKEN_COOKIE_KEY}={response.json()['refresh_token']}"}
+
+    # all of them write the token row of one user, a rotation moves it to another partition
+    requests = [
+        *(ac.post("/auth/login/", json=credentials) for _ in range(5)),
+        *(ac.get("/auth/refresh/", headers=headers) for _ in range(5)),
+        *(ac.post("/auth/logout/", headers=headers) for _ in range(5)),
+    ]
+    responses = await asyncio.gather(*requests)
+    assert all(response.status_code in (200, 403) for response in responses)
+    assert sum(response.status_code == 200 for response in responses[5:10]) <= 1
+
+    user = await db.auth.get_one(username=register_user[0])
+    tokens = await db.tokens.get_all_filtered(user_id=user.id)
+    assert len(tokens) <= 1
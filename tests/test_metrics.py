@@ -0,0 +1,146 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from src.api.middlewares import ServerTimingMiddleware
+from src.config import settings
+from src.main import app
+from src.models.auth import User
+from src.utils import server_timing
+from src.utils.db_tools import DBManager
+from src.utils.exceptions import ObjectNotFoundError
+from src.utils.metrics import MetricsRegistry, metrics_registry
+
+
+def test_render_exposition_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    in_use = registry.gauge("in_use", "In use")
+
+    requests.inc(route='/a"b')
+    requests.inc(2, route='/a"b')
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+    in_use.set(3)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{route="/a\\"b"} 3.0' in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1.0' in lines
+    assert 'latency_seconds_bucket{le="1.0"} 2.0' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3.0' in lines
+    assert "latency_seconds_sum 5.55" in lines
+    assert "latency_seconds_count 3.0" in lines
+    assert "in_use 3.0" in lines
+
+
+def _registry() -> tuple[MetricsRegistry, ...]:
+    registry = MetricsRegistry()
+    return (
+        registry,
+        registry.counter("requests_total", "Requests", ("route",)),
+        registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)),
+        registry.gauge("in_use", "In use"),
+        registry.gauge("last_run_seconds", "Last run", aggregate="latest"),
+    )
+
+
+def test_values_of_all_processes_are_summed(tmp_path: Path):
+    registry, requests, latency, in_use, last_run = _registry()
+    registry.use_directory(tmp_path)
+    requests.inc(route="/a")  # pyright: ignore
+    latency.observe(0.05)  # pyright: ignore
+    in_use.set(1)  # pyright: ignore
+
+    # another worker: same metrics, its own process and file
+    worker = f"""
+from pathlib import Path
+from tests.test_metrics import _registry
+registry, requests, latency, in_use, last_run = _registry()
+registry.directory = Path({str(tmp_path)!r})
+requests.inc(2, route="/a")
+requests.inc(route="/b")
+latency.observe(0.5)
+in_use.set(2)
+last_run.set(7)
+registry.flush()
+print(__import__("os").getpid())
+"""
+    output = subprocess.run([sys.executable, "-c", worker], check=True, capture_output=True, text=True).stdout
+    worker_pid = int(output.split()[-1])
+
+    lines = registry.render().splitlines()
+    assert 'requests_total{route="/a"} 3.0' in lines
+    assert 'requests_total{route="/b"} 1.0' in lines
+    assert 'latency_seconds_bucket{le="1.0"} 2.0' in lines
+    assert "in_use 3.0" in lines
+    assert "last_run_seconds 7.0" in lines
+
+    registry.mark_process_dead(worker_pid)
+    lines = registry.render().splitlines()
+    assert 'requests_total{route="/a"} 3.0' in lines
+    assert "in_use 1.0" in lines
+    assert "last_run_seconds 7.0" in lines
+
+    last_run.set(5)  # pyright: ignore
+    assert "last_run_seconds 5.0" in registry.render().splitlines()
+
+
+async def test_metrics_endpoint(ac: AsyncClient):
+    await ac.get("/auth/profile/")
+    await ac.post("/auth/login/", json={"username": "metrics_nobody", "password": "password"})
+
+    response = await ac.get(f"http://{settings.uvicorn.UVICORN_HOST}:{settings.uvicorn.UVICORN_PORT}/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    assert any(line.startswith('http_requests_total{method="GET",route="/api/v1/auth/profile/",status="403"}') for line in lines)
+    login_query = 'repo_query_duration_seconds_count{repo="AuthRepo",method="get_user_with_passwd"}'
+    assert any(line.startswith(login_query) for line in lines)
+    assert any(line.startswith('db_pool_checked_out_connections{engine="primary"}') for line in lines)
+
+
+def _query_count(repo: str, method: str) -> float:
+    observations = metrics_registry.collect()["repo_query_duration_seconds"].get((repo, method))
+    return 0.0 if observations is None else sum(observations[:-1])
+
+
+async def test_nested_repo_calls_are_timed_once(db: DBManager):
+    before = {method: _query_count("AuthRepo", method) for method in ("get_one", "get_one_as", "stream_filtered")}
+    with pytest.raises(ObjectNotFoundError):
+        await db.auth.get_one(id=0)
+    assert [batch async for batch in db.auth.stream_filtered(User.id == 0)] == []
+
+    assert _query_count("AuthRepo", "get_one") == before["get_one"] + 1
+    assert _query_count("AuthRepo", "get_one_as") == before["get_one_as"]
+    assert _query_count("AuthRepo", "stream_filtered") == before["stream_filtered"] + 1
+
+
+async def test_server_timing_header(ac: AsyncClient):
+    transport = ASGITransport(app=ServerTimingMiddleware(app))
+    async with AsyncClient(transport=transport, base_url=str(ac.base_url)) as client:
+        response = await client.post("/auth/login/", json={"username": "timing_nobody", "password": "password"})
+
+    phases = dict(entry.split(";dur=") for entry in response.headers["server-timing"].split(", "))
+    assert {"db", "total"} <= set(phases)
+    assert all(float(duration) >= 0 for duration in phases.values())
+    assert float(phases["db"]) <= float(phases["total"])
+
+
+def test_nested_timings_are_counted_once():
+    timings = server_timing.ServerTimings()
+    token = server_timing.start(timings)
+    try:
+        with server_timing.timing("db"):
+            with server_timing.timing("db"):
+                time.sleep(0.01)
+    finally:
+        server_timing.stop(token)
+    assert 0.01 <= timings.durations["db"] < 0.02
+    assert timings.header_value().startswith("db;dur=")
@@ -122,6 +122,18 @@ async def test_update_user_profile(authenticated_ac: AsyncClient):
     assert data["last_name"] == last_name
 
 
+async def test_update_profile_of_not_existing_user(authenticated_ac: AsyncClient):
+    access_token = TokenService().create_access_token({"sub": str(-1)})
+    response = await authenticated_ac.put(
+        "/auth/profile/",
+        json={"first_name": "John"},
+        headers={"Authorization": f"Bearer {access_token.token}"},
+    )
+    assert response.status_code == UserNotFoundHTTPError.status
+    data = response.json()
+    assert data["detail"] == UserNotFoundHTTPError.detail
+
+
 async def test_partially_update_user_profile(authenticated_ac: AsyncClient):
     first_name = "Ivan"
     last_name = "Ivanov"
@@ -0,0 +1,215 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError
+
+from src.db import (
+    EngineRouter,
+    engine,
+    engine_read_null_pool,
+    sessionmaker,
+    sessionmaker_null_pool,
+    sessionmaker_read,
+    sessionmaker_read_null_pool,
+)
+from src.models.auth import Token, User
+from src.repos.base import MAX_BIND_PARAMS
+from src.repos.mappers.mappers import AuthMapper
+from src.schemas.auth import TokenAddDTO, TokenType, UserAddDTO, UserDTO, UserWithPasswordDTO
+from src.utils.db_tools import DBManager
+from src.utils.exceptions import ObjectAlreadyExistsError, ObjectNotFoundError
+
+
+async def test_projected_reads_do_not_load_entities(db: DBManager):
+    user = await db.auth.add(UserAddDTO(username="projected_user", hashed_password="hash"))
+    await db.commit()
+    db.session.expunge_all()
+
+    profile = await db.auth.get_one(id=user.id)
+    assert type(profile) is UserDTO
+    assert profile.username == "projected_user"
+
+    user_with_password: UserWithPasswordDTO = await db.auth.get_user_with_passwd(id=user.id)
+    assert user_with_password.hashed_password == "hash"
+
+    users = await db.auth.get_all_filtered(id=user.id)
+    assert users == [profile]
+    assert len(db.session.identity_map) == 0
+
+    await db.auth.delete(id=user.id)
+    await db.commit()
+
+
+async def test_trusted_mapping_matches_validation(db: DBManager):
+    user = await db.auth.add(UserAddDTO(username="trusted_user", hashed_password="hash"))
+    await db.commit()
+
+    result = await db.session.execute(select(User.id, User.username, User.first_name, User.last_name).filter_by(id=user.id))
+    row = result.mappings().one()
+    trusted = AuthMapper.map_to_domain_entity(row)
+    assert type(trusted) is UserDTO
+    assert trusted == UserDTO.model_validate(dict(row))
+    assert trusted.model_fields_set == set(UserDTO.model_fields)
+    assert trusted.model_dump() == dict(row)
+
+    await db.auth.delete(id=user.id)
+    await db.commit()
+
+
+async def test_keyset_pages_and_stream(db: DBManager):
+    users = await db.auth.add_bulk(
+        [UserAddDTO(username=f"paged_user_{i:02d}", hashed_password="hash") for i in range(25)],
+    )
+    await db.commit()
+    ids = [user.id for user in users]
+    username_filter = User.username.like("paged_user_%")
+
+    paged_ids: list[int] = []
+    after_id = None
+    while page := await db.auth.get_page(username_filter, after_id=after_id, limit=10):
+        assert len(page) <= 10
+        paged_ids += [user.id for user in page]
+        after_id = page[-1].id
+    assert paged_ids == ids
+
+    batches = [batch async for batch in db.auth.stream_filtered(username_filter, batch_size=10)]
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert [user.id for batch in batches for user in batch] == ids
+
+    await db.auth.delete(True, username_filter)
+    await db.commit()
+
+
+async def test_copy_bulk(db: DBManager):
+    users = [UserAddDTO(username=f"copied_user_{i:02d}", hashed_password="hash") for i in range(25)]
+    ids = await db.auth.copy_bulk(users, return_ids=True, chunk_size=10)
+    assert ids and len(ids) == 25
+
+    tokens = [TokenAddDTO(user_id=id, type=TokenType.REFRESH, hashed_data=f"hash{id}", expires_at=datetime.now()) for id in ids]
+    assert await db.tokens.copy_bulk(tokens) is None
+    await db.commit()
+
+    copied = await db.auth.get_all_filtered(User.username.like("copied_user_%"))
+    assert [user.id for user in copied] == ids
+    assert [user.username for user in copied] == [user.username for user in users]
+    copied_tokens = await db.tokens.get_all_filtered(Token.user_id.in_(ids))
+    assert {token.type for token in copied_tokens} == {TokenType.REFRESH}
+
+    with pytest.raises(ObjectAlreadyExistsError):
+        await db.auth.copy_bulk(users[:1])
+    await db.rollback()
+
+    await db.tokens.delete(True, Token.user_id.in_(ids))
+    await db.auth.delete(True, User.id.in_(ids))
+    await db.commit()
+
+
+async def test_add_bulk_beyond_bind_parameter_limit(db: DBManager):
+    users = [UserAddDTO(username=f"bulk_user_{i:05d}", hashed_password="hash") for i in range(MAX_BIND_PARAMS // 2 + 10)]
+    added = await db.auth.add_bulk(users)
+    await db.commit()
+    assert [user.username for user in added] == [user.username for user in users]
+    assert len({user.id for user in added}) == len(users)
+
+    await db.auth.delete(True, User.username.like("bulk_user_%"))
+    await db.commit()
+
+
+async def test_db_manager_checks_out_connection_lazily():
+    async with DBManager(session_factory=sessionmaker) as db:
+        assert not db.session.in_transaction()
+        assert engine.pool.checkedout() == 0  # pyright: ignore
+
+        await db.auth.get_one_or_none(id=0)
+        assert engine.pool.checkedout() == 1  # pyright: ignore
+        await db.commit()
+        assert engine.pool.checkedout() == 0  # pyright: ignore
+        assert not db.session.in_transaction()
+    await engine.dispose()
+
+
+async def test_read_db_manager_is_read_only():
+    async with DBManager(session_factory=sessionmaker_read_null_pool) as db:
+        assert await db.auth.get_one_or_none(id=0) is None
+        with pytest.raises(DBAPIError, match="read-only transaction"):
+            await db.auth.add(UserAddDTO(username="read_only_user", hashed_password="hash"))
+
+
+async def test_read_and_write_sessions_share_the_pool():
+    async with DBManager(session_factory=sessionmaker_read) as db:
+        assert await db.auth.get_one_or_none(id=0) is None
+        with pytest.raises(DBAPIError, match="read-only transaction"):
+            await db.auth.add(UserAddDTO(username="read_only_user", hashed_password="hash"))
+    # the same connection goes back to read-write for the next write session
+    async with DBManager(session_factory=sessionmaker) as db:
+        user = await db.auth.add(UserAddDTO(username="shared_pool_user", hashed_password="hash"))
+        await db.commit()
+        await db.auth.delete(id=user.id)
+        await db.commit()
+    async with DBManager(session_factory=sessionmaker_read) as db:
+        with pytest.raises(DBAPIError, match="read-only transaction"):
+            await db.auth.add(UserAddDTO(username="read_only_user", hashed_password="hash"))
+    assert engine.pool.checkedin() == 1  # pyright: ignore
+    await engine.dispose()
+
+
+async def test_engine_router_selection():
+    engines = [SimpleNamespace(pool=SimpleNamespace(checkedout=lambda n=n: n)) for n in (3, 1, 2)]
+    router = EngineRouter(engines, "round_robin")  # pyright: ignore
+    assert [router.choose() for _ in range(4)] == [engines[0], engines[1], engines[2], engines[0]]
+    router = EngineRouter(engines, "least_busy")  # pyright: ignore
+    assert router.choose() is engines[1]
+
+
+async def test_reads_go_to_replica_until_commit():
+    # a read-only engine on the same database stands in for the replica
+    async with DBManager(session_factory=sessionmaker_null_pool, replica_router=EngineRouter([engine_read_null_pool])) as db:
+        assert await db.auth.get_one_or_none(username="replica_user") is None
+        assert db.auth.read_session is db.replica_session
+        assert not db.session.in_transaction()
+
+        user = await db.auth.add(UserAddDTO(username="replica_user", hashed_password="hash"))
+        assert db.auth.read_session is db.session
+        await db.commit()
+        assert db.auth.read_session is db.session
+        assert await db.auth.get_one(id=user.id)
+
+        await db.auth.delete(id=user.id)
+        await db.commit()
+
+
+async def test_credentials_and_tokens_are_read_from_primary():
+    async with DBManager(session_factory=sessionmaker_null_pool, replica_router=EngineRouter([engine_read_null_pool])) as db:
+        with pytest.raises(ObjectNotFoundError):
+            await db.auth.get_user_with_passwd(username="replica_user")
+        with pytest.raises(ObjectNotFoundError):
+            await db.tokens.get_valid(0, TokenType.REFRESH, expires_after=datetime.now())
+        assert "replica_session" not in db.__dict__
+        assert db.session.in_transaction()
+
+
+async def test_concurrent_upserts_keep_single_token(db: DBManager):
+    user = await db.auth.add(UserAddDTO(username="upsert_user", hashed_password="hash"))
+    await db.commit()
+
+    async def upsert(hashed_data: str) -> None:
+        async with DBManager(session_factory=sessionmaker_null_pool) as other_db:
+            token = TokenAddDTO(
+                user_id=user.id,
+                type=TokenType.REFRESH,
+                hashed_data=hashed_data,
+                expires_at=datetime.now() + timedelta(days=1),
+            )
+            await other_db.tokens.upsert(token)
+            await other_db.commit()
+
+    await asyncio.gather(*(upsert(f"upsert_token_{i}") for i in range(5)))
+    tokens = await db.tokens.get_all_filtered(user_id=user.id)
+    assert len(tokens) == 1
+
+    await db.tokens.delete(user_id=user.id)
+    await db.auth.delete(id=user.id)
+    await db.commit()
@@ -0,0 +1,83 @@
+from pathlib import Path
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from cryptography.hazmat.primitives.serialization import Encoding, NoEncryption, PrivateFormat, PublicFormat
+
+from src.schemas.auth import TokenType
+from src.utils.signers import EdDSASigner, ES256Signer, HS256Signer, JWTKeyStore, RS256Signer, Signer
+
+
+def _write_key_pair(private_key, directory: Path, name: str) -> tuple[Path, Path]:
+    private_path = directory / f"{name}-private.pem"
+    public_path = directory / f"{name}-public.pem"
+    private_path.write_bytes(private_key.private_bytes(Encoding.PEM, PrivateFormat.PKCS8, NoEncryption()))
+    public_path.write_bytes(private_key.public_key().public_bytes(Encoding.PEM, PublicFormat.SubjectPublicKeyInfo))
+    return private_path, public_path
+
+
+@pytest.fixture
+def signers(tmp_path: Path) -> dict[str, Signer]:
+    return {
+        "RS256": RS256Signer(*_write_key_pair(rsa.generate_private_key(65537, 2048), tmp_path, "rs256")),
+        "ES256": ES256Signer(*_write_key_pair(ec.generate_private_key(ec.SECP256R1()), tmp_path, "es256")),
+        "EdDSA": EdDSASigner(*_write_key_pair(ed25519.Ed25519PrivateKey.generate(), tmp_path, "eddsa")),
+        "HS256": HS256Signer("test-secret-" + "x" * 32),
+    }
+
+
+@pytest.mark.parametrize("algorithm", ["RS256", "ES256", "EdDSA", "HS256"])
+async def test_sign_and_verify(algorithm: str, signers: dict[str, Signer]):
+    key_store = JWTKeyStore(signers={TokenType.ACCESS: signers[algorithm]}, default_signer=signers["RS256"])
+    token = key_store.signer_for(TokenType.ACCESS).sign({"sub": "1"})
+
+    header = jwt.get_unverified_header(token)
+    assert header["alg"] == algorithm
+    verification_key = key_store.get_verification_key(header["kid"])
+    assert verification_key and verification_key.algorithm == algorithm
+    payload = jwt.decode(token, key=verification_key.key, algorithms=[verification_key.algorithm])
+    assert payload["sub"] == "1"
+
+
+async def test_signer_per_token_type(signers: dict[str, Signer]):
+    key_store = JWTKeyStore(
+        signers={TokenType.ACCESS: signers["EdDSA"], TokenType.REFRESH: signers["ES256"]},
+        default_signer=signers["RS256"],
+    )
+    assert key_store.signer_for(TokenType.ACCESS).algorithm == "EdDSA"
+    assert key_store.signer_for(TokenType.REFRESH).algorithm == "ES256"
+
+
+async def test_jwks_does_not_publish_shared_secrets(signers: dict[str, Signer]):
+    key_store = JWTKeyStore(
+        signers={TokenType.ACCESS: signers["HS256"], TokenType.REFRESH: signers["EdDSA"]},
+        default_signer=signers["RS256"],
+    )
+    content, _ = key_store.get_jwks()
+    keys = jwt.PyJWKSet.from_json(content.decode()).keys
+    assert {key.key_id for key in keys} == {signers["RS256"].kid, signers["EdDSA"].kid}
+
+
+async def test_signer_rejects_wrong_key_type(tmp_path: Path):
+    signer = ES256Signer(*_write_key_pair(rsa.generate_private_key(65537, 2048), tmp_path, "rsa"))
+    with pytest.raises(TypeError):
+        signer.sign({"sub": "1"})
+
+
+async def test_signer_rejects_mismatched_key_pair(tmp_path: Path):
+    signing_key = ed25519.Ed25519PrivateKey.generate()
+    private_path, _ = _write_key_pair(signing_key, tmp_path, "signing")
+    _, public_path = _write_key_pair(ed25519.Ed25519PrivateKey.generate(), tmp_path, "other")
+    signer = EdDSASigner(private_path, public_path, check_interval=0)
+    key_store = JWTKeyStore(signers={}, default_signer=signer)
+    with pytest.raises(ValueError, match="does not match"):
+        key_store.check()
+    with pytest.raises(ValueError, match="does not match"):
+        signer.sign({"sub": "1"})
+
+    # the matching public key arrives, as at the end of a key rotation
+    public_path.write_bytes(signing_key.public_key().public_bytes(Encoding.PEM, PublicFormat.SubjectPublicKeyInfo))
+    key_store.check()
+    token = signer.sign({"sub": "1"})
+    assert key_store.get_verification_key(jwt.get_unverified_header(token)["kid"]) is not None
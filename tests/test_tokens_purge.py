@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+from httpx import AsyncClient
+from sqlalchemy import func, select, text
+
+from src.config import settings
+from src.db import engine_null_pool
+from src.models.auth import Token, User
+from src.schemas.auth import TokenAddDTO, TokenType, UserAddDTO
+from src.utils.db_tools import TOKENS_PURGE_LOCK_KEY, DBManager, ExpiredTokensPurger
+
+
+async def test_purge_deletes_only_expired_tokens(db: DBManager):
+    users = await db.auth.add_bulk([UserAddDTO(username=f"purge_user_{i}", hashed_password="hash") for i in range(6)])
+    now = datetime.now()
+    await db.tokens.add_bulk(
+        [
+            TokenAddDTO(
+                user_id=user.id,
+                type=TokenType.REFRESH,
+                hashed_data=f"purge_token_{user.id}",
+                expires_at=now + timedelta(days=1) if i == 0 else now - timedelta(minutes=i),
+            )
+            for i, user in enumerate(users)
+        ]
+    )
+    await db.commit()
+
+    purger = ExpiredTokensPurger(engine=engine_null_pool, batch_size=2, max_batches_per_second=0)
+    assert await purger.purge() == 5
+    assert purger.runs == 1
+    assert purger.batches == 3
+    assert purger.deleted == 5
+
+    user_ids = [user.id for user in users]
+    remaining = await db.tokens.get_all_filtered(Token.user_id.in_(user_ids))
+    assert [token.user_id for token in remaining] == [users[0].id]
+
+    await db.tokens.delete(True, Token.user_id.in_(user_ids))
+    await db.auth.delete(True, User.id.in_(user_ids))
+    await db.commit()
+
+
+async def test_purge_is_skipped_while_another_worker_holds_the_lock():
+    purger = ExpiredTokensPurger(engine=engine_null_pool)
+    async with engine_null_pool.connect() as conn:
+        assert await conn.scalar(select(func.pg_try_advisory_lock(TOKENS_PURGE_LOCK_KEY)))
+        assert await purger.purge() is None
+        await conn.scalar(select(func.pg_advisory_unlock(TOKENS_PURGE_LOCK_KEY)))
+    assert purger.skipped_runs == 1
+    assert purger.runs == 0
+
+    assert await purger.purge() == 0
+    assert purger.runs == 1
+
+
+async def test_purge_maintains_partitions(db: DBManager):
+    user = await db.auth.add(UserAddDTO(username="partition_user", hashed_password="hash"))
+    await db.commit()
+    now = datetime.now()
+    async with engine_null_pool.begin() as conn:
+        lower, upper = now - timedelta(days=30), now - timedelta(days=20)
+        await conn.execute(text(f"CREATE TABLE tokens_expired PARTITION OF tokens FOR VALUES FROM ('{lower}') TO ('{upper}')"))
+    # beyond every range partition, so it starts in the default one
+    await db.tokens.add(
+        TokenAddDTO(
+            user_id=user.id,
+            type=TokenType.REFRESH,
+            hashed_data="partition_token",
+            expires_at=now + timedelta(days=90),
+        )
+    )
+    await db.commit()
+
+    purger = ExpiredTokensPurger(engine=engine_null_pool, partitions_ahead=timedelta(days=100))
+    await purger.purge()
+    assert purger.partitions_dropped == 1
+    assert purger.partitions_created > 0
+
+    async with engine_null_pool.connect() as conn:
+        partitions = set(
+            await conn.scalars(text("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'tokens'::regclass"))
+        )
+        partition = await conn.scalar(text("SELECT tableoid::regclass::text FROM tokens WHERE hashed_data = 'partition_token'"))
+    assert "tokens_expired" not in partitions
+    assert partition in partitions - {"tokens_default"}
+
+    await db.tokens.delete(user_id=user.id)
+    await db.auth.delete(id=user.id)
+    await db.commit()
+
+
+async def test_purge_metrics_are_exported(ac: AsyncClient):
+    purger = ExpiredTokensPurger(engine=engine_null_pool)
+    await purger.purge()
+
+    response = await ac.get(f"http://{settings.uvicorn.UVICORN_HOST}:{settings.uvicorn.UVICORN_PORT}/metrics")
+    lines = response.text.splitlines()
+    assert any(line.startswith('tokens_purge_runs_total{result="completed"}') for line in lines)
+    assert any(line.startswith("tokens_purged_total ") for line in lines)
+    assert f"tokens_purge_last_run_seconds {purger.last_run_seconds!r}" in lines